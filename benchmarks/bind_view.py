@@ -0,0 +1,40 @@
+"""
+Times binding the permissions of the templates to the views of an admin,
+which is done for every request that renders a permission check.
+"""
+import time
+
+import django
+
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.test.client import RequestFactory  # noqa: E402
+
+from blog.models import Post  # noqa: E402
+from djadmin2.permissions import TemplatePermissionChecker  # noqa: E402
+from djadmin2.site import djadmin2_site  # noqa: E402
+from djadmin2.types import ModelAdmin2  # noqa: E402
+
+REQUESTS = 10000
+
+
+def main():
+    model_admin = ModelAdmin2(Post, djadmin2_site)
+    factory = RequestFactory()
+    names = list(TemplatePermissionChecker.view_name_mapping)
+
+    start = time.perf_counter()
+    for run in range(REQUESTS):
+        request = factory.get('/')
+        request.user = AnonymousUser()
+        permissions = TemplatePermissionChecker(request, model_admin)
+        for name in names:
+            permissions.bind_view(name)
+    elapsed = time.perf_counter() - start
+    print('bind_view: %d calls per second' % (
+        REQUESTS * len(names) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
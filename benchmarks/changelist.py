@@ -0,0 +1,62 @@
+"""
+Times the rendering of the list view of 100 posts with 5 columns.
+"""
+import statistics
+import time
+
+import django
+
+django.setup()
+
+from django.contrib.auth.models import Permission, User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.client import RequestFactory  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from blog.models import Post  # noqa: E402
+from djadmin2 import views  # noqa: E402
+from djadmin2.site import djadmin2_site  # noqa: E402
+from djadmin2.types import ModelAdmin2  # noqa: E402
+
+ROWS = 100
+RUNS = 30
+
+
+class PostAdmin(ModelAdmin2):
+    list_display = ('title', 'body', 'published', 'published_date', '__str__')
+    list_per_page = ROWS
+    ordering = ['pk']
+
+
+def main():
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    Post.objects.bulk_create([
+        Post(title='post %d' % index, body='body %d' % index)
+        for index in range(ROWS)])
+    user = User.objects.create(username='staff', is_staff=True)
+    user.user_permissions.set(Permission.objects.filter(
+        content_type__app_label='blog', content_type__model='post'))
+    user = User.objects.get(pk=user.pk)
+
+    model_admin = PostAdmin(Post, djadmin2_site)
+    view = views.ModelListView.as_view(**model_admin.get_index_kwargs())
+    url = reverse('admin2:blog_post_index')
+    factory = RequestFactory()
+
+    timings = []
+    for run in range(RUNS):
+        request = factory.get(url)
+        request.user = user
+        start = time.perf_counter()
+        view(request).render()
+        timings.append(time.perf_counter() - start)
+    # The first runs fill the caches
+    timings = timings[5:]
+    print('list view of %d rows: median %.1f ms, min %.1f ms' % (
+        ROWS, statistics.median(timings) * 1000, min(timings) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,13 @@
 from django.contrib import messages
 from django.db import router
+from django.http import StreamingHttpResponse
 from django.utils.encoding import force_str
 from django.utils.text import capfirst
 from django.utils.translation import gettext as _
 from django.utils.translation import gettext_lazy, ngettext, pgettext_lazy
 from django.views.generic import TemplateView
 
-from . import permissions, utils
+from . import exports, permissions, utils
 from .viewmixins import Admin2ModelMixin
 
 
@@ -41,7 +42,8 @@ class BaseListAction(Admin2ModelMixin, TemplateView):
         self.app_label = options.app_label
         self.model_name = options.model_name
 
-        self.item_count = len(queryset)
+        # Count in the database, the queryset may be too big to load
+        self.item_count = queryset.count()
 
         if self.item_count <= 1:
             objects_name = options.verbose_name
@@ -169,3 +171,80 @@ class DeleteSelectedAction(BaseListAction):
     def process_queryset(self):
         # The user has confirmed that they want to delete the objects.
         self.get_queryset().delete()
+
+
+class ExportAction(BaseListAction):
+    """
+    Streams the selected items as a file in the ``export_format``, with the
+    columns of ``list_display``. The rows are read with ``iterator()`` and
+    written while they are read, so exports of any size take constant
+    memory.
+
+    With ``only_selected = False`` all items of the list are exported, as
+    searched and filtered.
+    """
+    export_format = None
+    #: How many rows are read from the database at a time.
+    chunk_size = 2000
+    #: Give actions that don't only get the selected items the searched and
+    #: filtered queryset of the list.
+    filtered_queryset = True
+
+    permission_classes = BaseListAction.permission_classes + (
+        permissions.ModelViewPermission,
+    )
+
+    def get_columns(self):
+        """
+        Returns the ``(name, header)`` pairs of the exported columns: the
+        columns of ``list_display``, or the ones of them that are given as
+        ``export_column`` parameters.
+        """
+        columns = exports.get_export_columns(
+            self.model, self.model_admin.list_display)
+        selected = self.request.POST.getlist('export_column')
+        if selected:
+            columns = [column for column in columns if column[0] in selected]
+        return columns
+
+    def get_filename(self):
+        return '%s.%s' % (
+            utils.model_options(self.model).model_name,
+            exports.get_export_writer_class(self.export_format).extension)
+
+    def iter_rows(self, names):
+        columns = [self.model_admin.get_list_column(name) for name in names]
+        queryset = exports.get_export_queryset(self.get_queryset(), names)
+        for obj in exports.iter_objects(queryset, self.chunk_size):
+            yield [column.get_value(obj) for column in columns]
+
+    def post(self, request):
+        if not self.item_count:
+            messages.add_message(request, messages.INFO, _(self.empty_message))
+            return None
+        columns = self.get_columns()
+        writer_class = exports.get_export_writer_class(self.export_format)
+        names = [name for name, header in columns]
+        writer = writer_class(
+            [header for name, header in columns], names=names)
+        response = StreamingHttpResponse(
+            writer.write(self.iter_rows(names)),
+            content_type=writer.content_type)
+        response['Content-Disposition'] = (
+            'attachment; filename="%s"' % self.get_filename())
+        return response
+
+
+class CSVExportAction(ExportAction):
+    description = gettext_lazy("Export selected items as CSV")
+    export_format = 'csv'
+
+
+class JSONLinesExportAction(ExportAction):
+    description = gettext_lazy("Export selected items as JSON Lines")
+    export_format = 'jsonl'
+
+
+class XLSXExportAction(ExportAction):
+    description = gettext_lazy("Export selected items as XLSX")
+    export_format = 'xlsx'
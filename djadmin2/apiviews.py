@@ -1,10 +1,19 @@
+import collections.abc
+import operator
+from functools import reduce
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Q
+from django.http import Http404
+from django.urls import reverse
 from django.utils.encoding import force_str
 from rest_framework import fields, generics, serializers
 from rest_framework.response import Response
 from rest_framework.reverse import reverse as drf_reverse
 from rest_framework.views import APIView
 
-from . import utils
+from . import filters, permissions, search, settings, utils
 from .viewmixins import Admin2Mixin
 
 API_VERSION = '0.1'
@@ -39,6 +48,9 @@ class Admin2APIMixin(Admin2Mixin):
     model = None
     raise_exception = True
 
+    def get_queryset(self):
+        return self.filter_permitted_queryset(super().get_queryset())
+
     def get_serializer_class(self):
         if self.serializer_class is None:
             model_class = self.get_model()
@@ -112,3 +124,100 @@ class ListCreateAPIView(Admin2APIMixin, generics.ListCreateAPIView):
 
 class RetrieveUpdateDestroyAPIView(Admin2APIMixin, generics.RetrieveUpdateDestroyAPIView):
     pass
+
+
+class FilterChoicesAPIView(Admin2APIMixin, APIView):
+    """
+    Returns the choices of a :class:`djadmin2.filters.CachedModelChoiceFilter`
+    that match the ``q`` parameter, for the search field below the choices.
+    """
+    permission_classes = (
+        permissions.IsStaffPermission,
+        permissions.ModelViewPermission)
+
+    def get_filter(self, field_name):
+        list_filter = self.model_admin.list_filter
+        if isinstance(list_filter, collections.abc.Iterable):
+            filterset_class = filters.get_list_filter_class(
+                self.get_model(), list_filter)
+        else:
+            filterset_class = list_filter
+        filter_ = filterset_class.base_filters.get(field_name)
+        if not isinstance(filter_, filters.CachedModelChoiceFilter):
+            raise Http404
+        if not filter_.search_fields:
+            raise Http404
+        filterset = filterset_class(
+            request=self.request, queryset=self.get_queryset())
+        return filterset.filters[field_name]
+
+    def get(self, request, field_name):
+        filter_ = self.get_filter(field_name)
+        choices = filter_.search_choices(request.query_params.get('q', ''))
+        return Response([
+            {'value': value, 'label': force_str(label)}
+            for value, label in choices
+        ])
+
+
+class AutocompleteAPIView(Admin2APIMixin, APIView):
+    """
+    Returns the objects whose ``autocomplete_search_fields`` start with the
+    ``q`` parameter, at most ``autocomplete_limit`` of them. Results are
+    cached for ``autocomplete_cache_timeout`` seconds.
+    """
+    permission_classes = (
+        permissions.IsStaffPermission,
+        permissions.ModelViewPermission)
+
+    def get_search_fields(self):
+        fields = self.model_admin.autocomplete_search_fields
+        if fields is None:
+            fields = [search.get_search_field_name(field)
+                      for field in self.model_admin.search_fields]
+        return fields
+
+    def get_results(self, term):
+        fields = self.get_search_fields()
+        queryset = self.get_queryset().filter(reduce(operator.or_, [
+            Q(**{'%s__istartswith' % field: term}) for field in fields
+        ]))
+        if any(utils.get_lookup_path_info(self.get_model(), field).needs_distinct
+               for field in fields):
+            queryset = queryset.distinct()
+        queryset = queryset.order_by(*(self.model_admin.ordering or ['pk']))
+        if self.model_admin.list_str_fields is not None:
+            queryset = queryset.only(*self.model_admin.list_str_fields)
+        detail_view = utils.admin2_urlname(self, 'detail')
+        return [
+            {
+                'pk': obj.pk,
+                'label': force_str(obj),
+                'url': reverse(detail_view, kwargs={'pk': obj.pk}),
+            }
+            for obj in queryset[:self.model_admin.autocomplete_limit]
+        ]
+
+    def get(self, request):
+        term = request.query_params.get('q', '').strip()
+        if not term or not self.get_search_fields():
+            return Response([])
+
+        timeout = self.model_admin.autocomplete_cache_timeout
+        if not timeout:
+            return Response(self.get_results(term))
+        cache = caches[settings.ADMIN2_CACHE]
+        # The queryset is part of the key, since the permissions can limit
+        # it for the user
+        try:
+            sql, params = self.get_queryset().query.sql_with_params()
+        except EmptyResultSet:
+            return Response([])
+        key = utils.get_cache_key(
+            'autocomplete', self.get_model()._meta.label, term.lower(),
+            self.model_admin.autocomplete_limit, sql, params)
+        results = cache.get(key)
+        if results is None:
+            results = self.get_results(term)
+            cache.set(key, results, timeout)
+        return Response(results)
@@ -14,3 +14,6 @@ class Djadmin2Config(AppConfig):
             create_view_permissions,
             dispatch_uid="django-admin2.djadmin2.permissions.create_view_permissions"
         )
+        # The models of django.contrib.auth can't be imported earlier
+        from djadmin2.backends import connect_signals
+        connect_signals()
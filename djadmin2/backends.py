@@ -0,0 +1,154 @@
+"""
+An authentication backend that keeps the permissions of the users in the
+cache between requests.
+
+Django's ``ModelBackend`` loads the permissions of a user from the database
+once per user object, which is once per request. Add the backend in place of
+it to ``AUTHENTICATION_BACKENDS``::
+
+    AUTHENTICATION_BACKENDS = ['djadmin2.backends.CachedPermissionBackend']
+
+The permissions are stored in the ``ADMIN2_CACHE`` cache under keys that
+contain a version of the user and a version of all users. Changing the groups
+or permissions of a user replaces the version of the user, changing a group or
+a permission replaces the version of all users, so that the old entries are
+never read again.
+"""
+import uuid
+
+from django.contrib.auth import get_backends, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import settings, utils
+
+VERSION_KEY = 'djadmin2:permissions:version'
+
+
+def get_user_version_key(user_pk):
+    return '%s:%s' % (VERSION_KEY, user_pk)
+
+
+def get_cache():
+    return caches[settings.ADMIN2_CACHE]
+
+
+def invalidate_user_permissions(user_pks):
+    """
+    Makes the backend load the permissions of the users with the given
+    primary keys again.
+    """
+    get_cache().set_many(
+        dict((get_user_version_key(pk), uuid.uuid4().hex) for pk in user_pks),
+        None)
+
+
+def invalidate_permissions():
+    """
+    Makes the backend load the permissions of all users again.
+    """
+    get_cache().set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    A ``ModelBackend`` that keeps the set of permissions of each user in
+    the ``ADMIN2_CACHE`` cache. Object permissions aren't cached, the model
+    backend has none.
+    """
+
+    def get_versions(self, user_obj):
+        cache = get_cache()
+        keys = [VERSION_KEY, get_user_version_key(user_obj.pk)]
+        versions = cache.get_many(keys)
+        # A version that the cache has lost is replaced, an old entry that
+        # it still has must not be read with the new one
+        missing = dict(
+            (key, uuid.uuid4().hex) for key in keys if key not in versions)
+        if missing:
+            cache.set_many(missing, None)
+            versions.update(missing)
+        return [versions[key] for key in keys]
+
+    def get_cached_permissions(self, user_obj):
+        cache = get_cache()
+        key = utils.get_cache_key(
+            'permissions', user_obj.pk, *self.get_versions(user_obj))
+        permissions = cache.get(key)
+        if permissions is None:
+            permissions = super().get_all_permissions(user_obj)
+            cache.set(key, permissions, settings.ADMIN2_PERMISSION_CACHE_TIMEOUT)
+        return permissions
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = self.get_cached_permissions(user_obj)
+        return user_obj._perm_cache
+
+
+def is_enabled():
+    return any(
+        isinstance(backend, CachedPermissionBackend)
+        for backend in get_backends())
+
+
+def permissions_changed(sender, **kwargs):
+    if is_enabled():
+        invalidate_permissions()
+
+
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # The active and the superuser flag change the permissions too, the
+    # last_login that is saved at every login doesn't
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    if is_enabled():
+        invalidate_user_permissions([instance.pk])
+
+
+def user_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not is_enabled() or action not in (
+            'post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user_permissions([instance.pk])
+    elif pk_set:
+        # A group or permission got or lost users
+        invalidate_user_permissions(pk_set)
+    else:
+        # A group or permission lost all its users, which aren't known
+        # anymore
+        invalidate_permissions()
+
+
+def connect_signals():
+    """
+    Connects the invalidation of the cached permissions to the changes of
+    users, groups and permissions. Called when djadmin2 is ready.
+    """
+    uid = 'djadmin2.backends.%s'
+    # Deleting a group or a permission doesn't send m2m_changed for the
+    # rows of the relations that are deleted with it
+    post_save.connect(
+        permissions_changed, sender=Permission, dispatch_uid=uid % 'permission')
+    post_delete.connect(
+        permissions_changed, sender=Permission, dispatch_uid=uid % 'permission')
+    post_delete.connect(
+        permissions_changed, sender=Group, dispatch_uid=uid % 'group')
+    m2m_changed.connect(
+        permissions_changed, sender=Group.permissions.through,
+        dispatch_uid=uid % 'group_permissions')
+
+    user_model = get_user_model()
+    post_save.connect(
+        user_changed, sender=user_model, dispatch_uid=uid % 'user')
+    for name in ('groups', 'user_permissions'):
+        field = getattr(user_model, name, None)
+        if field is not None:
+            m2m_changed.connect(
+                user_relations_changed, sender=field.through,
+                dispatch_uid=uid % name)
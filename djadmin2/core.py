@@ -54,6 +54,8 @@ class Admin2:
         if not model_admin:
             model_admin = types.ModelAdmin2
         self.registry[model] = model_admin(model, admin=self, **kwargs)
+        utils.register_lookup_paths(
+            model, self.registry[model].get_lookup_paths())
 
         # Add the model to the apps registry
         app_label = utils.model_options(model).app_label
@@ -75,6 +77,7 @@ class Admin2:
             raise ImproperlyConfigured(
                 "%s was never registered in django-admin2" % model
             )
+        utils.deregister_lookup_paths(model)
 
         # Remove the model from the apps registry
         # Get the app label
@@ -0,0 +1,293 @@
+"""
+Writers that turn the rows of a queryset into CSV, JSON Lines or XLSX files
+while they are read from the database. A writer yields the file in pieces,
+so that an export can be streamed with a ``StreamingHttpResponse`` in
+constant memory, however many rows there are.
+"""
+import csv
+import datetime
+import decimal
+import re
+import zipfile
+from itertools import islice
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, prefetch_related_objects
+from django.utils.encoding import force_str
+from django.utils.text import capfirst
+
+from . import utils
+
+
+def get_export_columns(model, names):
+    """
+    Returns the ``(name, header)`` pairs of the columns of ``list_display``
+    that can be exported. Callables, which have no name in the request,
+    are left out.
+    """
+    columns = []
+    for name in names:
+        if not isinstance(name, str):
+            continue
+        if name == '__str__':
+            header = utils.model_verbose_name(model)
+        else:
+            header = utils.get_lookup_path_info(model, name).verbose_name or name
+        columns.append((name, force_str(capfirst(header))))
+    return columns
+
+
+def get_export_queryset(queryset, names):
+    """
+    Returns the queryset with the relations of the columns joined and, if
+    the columns are all fields, only their database columns loaded.
+    """
+    model = queryset.model
+    select_related = utils.get_list_select_related(model, names)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    only = utils.get_list_only_fields(
+        model, names, select_related=select_related)
+    if only is not None:
+        queryset = queryset.only(*only)
+    return queryset
+
+
+def iter_objects(queryset, chunk_size):
+    """
+    Yields the objects of the queryset, reading ``chunk_size`` rows at a
+    time. Prefetches are done per chunk, since ``iterator()`` ignores them.
+    """
+    objects = queryset.iterator(chunk_size=chunk_size)
+    lookups = queryset._prefetch_related_lookups
+    while True:
+        chunk = list(islice(objects, chunk_size))
+        if not chunk:
+            break
+        if lookups:
+            prefetch_related_objects(chunk, *lookups)
+        yield from chunk
+
+
+class BaseExportWriter:
+    """
+    Base class of the export writers.
+
+    :param headers: The headers of the columns.
+    :param names: The names of the columns in ``list_display``, the headers
+                  by default.
+    """
+    content_type = None
+    extension = None
+
+    def __init__(self, headers, names=None):
+        self.headers = list(headers)
+        self.names = self.headers if names is None else list(names)
+
+    def format_value(self, value):
+        """
+        Returns the value as it is written to the file.
+        """
+        if value is None:
+            return ''
+        if isinstance(value, Model):
+            return force_str(value)
+        return value
+
+    def write(self, rows):
+        """
+        Yields the file in pieces for the rows, which are lists of values.
+        """
+        raise NotImplementedError
+
+
+class _Echo:
+    # A file-like object that returns what is written to it, for the csv
+    # writer.
+    def write(self, value):
+        return value
+
+
+class CSVExportWriter(BaseExportWriter):
+    content_type = 'text/csv'
+    extension = 'csv'
+    #: How many rows are written into one piece.
+    rows_per_piece = 100
+    #: Text starting with one of these is prefixed with ``'``, so that a
+    #: spreadsheet doesn't run it as a formula.
+    formula_prefixes = ('=', '+', '-', '@', '\t', '\r')
+
+    def format_value(self, value):
+        value = super().format_value(value)
+        if isinstance(value, str) and value.startswith(self.formula_prefixes):
+            return "'" + value
+        return value
+
+    def write(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.headers)
+        piece = []
+        for row in rows:
+            piece.append(writer.writerow(
+                [self.format_value(value) for value in row]))
+            if len(piece) >= self.rows_per_piece:
+                yield ''.join(piece)
+                piece = []
+        if piece:
+            yield ''.join(piece)
+
+
+class JSONLinesExportWriter(BaseExportWriter):
+    """
+    Writes a JSON object per row, with the column names as keys. Unlike
+    the headers they don't depend on the language and are unique.
+    """
+    content_type = 'application/x-ndjson'
+    extension = 'jsonl'
+    rows_per_piece = 100
+
+    def format_value(self, value):
+        if isinstance(value, Model):
+            return force_str(value)
+        return value
+
+    def write(self, rows):
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        piece = []
+        for row in rows:
+            piece.append(encoder.encode(dict(zip(
+                self.names,
+                [self.format_value(value) for value in row]))) + '\n')
+            if len(piece) >= self.rows_per_piece:
+                yield ''.join(piece)
+                piece = []
+        if piece:
+            yield ''.join(piece)
+
+
+class _ZipStream:
+    # A write-only file for zipfile that hands out what has been written
+    # since the last call of pop().
+    def __init__(self):
+        self.pieces = []
+        self.position = 0
+
+    def write(self, data):
+        self.pieces.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.pieces)
+        self.pieces = []
+        return data
+
+
+# Characters that XML 1.0 doesn't allow
+_illegal_xml_chars = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def _xml_escape(value):
+    value = _illegal_xml_chars.sub('', value)
+    return (value.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+class XLSXExportWriter(BaseExportWriter):
+    """
+    Writes an Excel workbook with one sheet. The sheet is compressed into
+    the zip file while it is written, row by row. Text is written as inline
+    strings, so no shared strings table has to be kept in memory.
+    """
+    content_type = (
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    extension = 'xlsx'
+    rows_per_piece = 500
+
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>')
+    root_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>')
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>')
+    workbook_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>')
+
+    def format_cell(self, value):
+        value = self.format_value(value)
+        if isinstance(value, bool):
+            return '<c t="b"><v>%d</v></c>' % value
+        if isinstance(value, (int, float, decimal.Decimal)):
+            return '<c><v>%s</v></c>' % value
+        if isinstance(value, (datetime.date, datetime.time)):
+            value = value.isoformat()
+        return '<c t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % (
+            _xml_escape(force_str(value)))
+
+    def format_row(self, row):
+        return '<row>%s</row>' % ''.join(self.format_cell(value) for value in row)
+
+    def write(self, rows):
+        stream = _ZipStream()
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('[Content_Types].xml', self.content_types)
+            archive.writestr('_rels/.rels', self.root_rels)
+            archive.writestr('xl/workbook.xml', self.workbook)
+            archive.writestr('xl/_rels/workbook.xml.rels', self.workbook_rels)
+            with archive.open('xl/worksheets/sheet1.xml', 'w',
+                              force_zip64=True) as sheet:
+                sheet.write((
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/'
+                    'spreadsheetml/2006/main"><sheetData>').encode())
+                sheet.write(self.format_row(self.headers).encode())
+                piece = []
+                for row in rows:
+                    piece.append(self.format_row(row))
+                    if len(piece) >= self.rows_per_piece:
+                        sheet.write(''.join(piece).encode())
+                        piece = []
+                        yield stream.pop()
+                sheet.write(''.join(piece).encode())
+                sheet.write(b'</sheetData></worksheet>')
+        yield stream.pop()
+
+
+#: The writers of the export formats, by format name.
+EXPORT_WRITERS = {
+    'csv': CSVExportWriter,
+    'jsonl': JSONLinesExportWriter,
+    'xlsx': XLSXExportWriter,
+}
+
+
+def get_export_writer_class(export_format):
+    try:
+        return EXPORT_WRITERS[export_format]
+    except KeyError:
+        raise ImproperlyConfigured(
+            "Unknown export format %r, use one of %s." % (
+                export_format, ', '.join(sorted(EXPORT_WRITERS))))
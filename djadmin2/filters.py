@@ -1,8 +1,13 @@
 import collections.abc
+import operator
+from functools import reduce
 from itertools import chain
 
 import django_filters
 from django import forms
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.db.models import Count, Q
 from django.forms import widgets as django_widgets
 from django.forms.utils import flatatt
 from django.utils.encoding import force_str
@@ -10,7 +15,8 @@ from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy
 
-from .utils import type_str
+from . import settings
+from .utils import get_cache_key, type_str
 
 LINK_TEMPLATE = '<a href=?{0}={1} {2}>{3}</a>'
 
@@ -24,7 +30,7 @@ class ChoicesAsLinksWidget(django_widgets.Select):
     instead of select element with options.
     """
 
-    def render(self, name, value, attrs=None, choices=()):
+    def render(self, name, value, attrs=None, renderer=None, choices=()):
         links = []
         for choice_value, choice_label in chain(self.choices, choices):
             links.append(format_html(
@@ -47,6 +53,186 @@ class NullBooleanLinksWidget(
         ]
 
 
+class FilterChoicesWidget(ChoicesAsLinksWidget):
+    """Renders the choices of a :class:`CachedModelChoiceFilter`
+    as links, followed by a search field for the choices that
+    aren't listed if the filter has ``search_fields``.
+    """
+
+    def __init__(self, attrs=None, choices=(), typeahead=False):
+        super().__init__(attrs, choices)
+        self.typeahead = typeahead
+
+    def render(self, name, value, attrs=None, renderer=None, choices=()):
+        output = super().render(name, value, attrs, renderer, choices)
+        if self.typeahead:
+            output += format_html(
+                '<input type="search" class="form-control input-sm '
+                'filter-typeahead" data-field="{0}" placeholder="{1}">'
+                '<div class="filter-typeahead-results"></div>',
+                name, gettext_lazy('Search'),
+            )
+        return output
+
+
+class FilterChoiceIterator:
+    """Iterates over the choices that the filter of the field
+    loads. Nothing is queried before the choices are rendered.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self.field.choice_loader()
+
+    def __len__(self):
+        empty = int(self.field.empty_label is not None)
+        return len(self.field.choice_loader()) + empty
+
+
+class CachedModelChoiceField(django_filters.fields.ModelChoiceField):
+    """Model choice field that gets its choices from a loader
+    instead of iterating over the whole queryset. The queryset
+    is only used to validate the selected value.
+    """
+    choice_loader = None
+
+    @property
+    def choices(self):
+        if self.choice_loader is None:
+            return super().choices
+        return FilterChoiceIterator(self)
+
+    @choices.setter
+    def choices(self, value):
+        django_filters.fields.ModelChoiceField.choices.fset(self, value)
+
+
+class CachedModelChoiceFilter(django_filters.ModelChoiceFilter):
+    """Filter for foreign key and many-to-many fields with a
+    large related table.
+
+    :param limit: The maximal number of choices that are shown.
+    :param mode: ``"all"`` shows the related objects in the order of
+        the queryset, ``"frequency"`` the related objects that occur
+        the most in the current results, counted with one
+        ``GROUP BY`` query.
+    :param cache_timeout: Seconds to keep the choices in the
+        ``ADMIN2_CACHE`` cache. ``0`` disables caching.
+    :param search_fields: Fields of the related model that the
+        search field below the choices searches. The choices are
+        fetched from the ``api_filter_choices`` API view.
+    """
+    field_class = CachedModelChoiceField
+    modes = ('all', 'frequency')
+    search_limit = 20
+
+    def __init__(self, *args, limit=None, mode='all', cache_timeout=0,
+                 search_fields=(), **kwargs):
+        if mode not in self.modes:
+            raise ImproperlyConfigured(
+                "The mode of a CachedModelChoiceFilter is one of %s, "
+                "not %r." % (', '.join(self.modes), mode))
+        self.limit = limit
+        self.mode = mode
+        self.cache_timeout = cache_timeout
+        self.search_fields = tuple(search_fields)
+        kwargs.setdefault(
+            'widget', FilterChoicesWidget(typeahead=bool(search_fields)))
+        super().__init__(*args, **kwargs)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if queryset is None:
+            field = django_filters.utils.get_model_field(
+                self.model, self.field_name)
+            queryset = field.remote_field.model._default_manager.all()
+        return queryset
+
+    @property
+    def field(self):
+        field = super().field
+        if field.choice_loader is None:
+            field.choice_loader = self.get_choices
+            field.widget.choices = field.choices
+        return field
+
+    def get_choices(self):
+        """Returns the ``(value, label)`` choices, loaded once per
+        request and taken from the cache if possible.
+        """
+        if not hasattr(self, '_choices'):
+            try:
+                key = self.get_cache_key()
+            except EmptyResultSet:
+                self._choices = []
+                return self._choices
+            cache = caches[settings.ADMIN2_CACHE]
+            choices = cache.get(key) if self.cache_timeout else None
+            if choices is None:
+                choices = self.load_choices()
+                if self.cache_timeout:
+                    cache.set(key, choices, self.cache_timeout)
+            self._choices = choices
+        return self._choices
+
+    def get_cache_key(self):
+        queries = [self.get_queryset(self.get_request())]
+        if self.mode == 'frequency':
+            queries.append(self.parent.queryset)
+        parts = [self.model._meta.label, self.field_name, self.mode,
+                 self.limit]
+        for queryset in queries:
+            sql, params = queryset.query.sql_with_params()
+            parts.extend((sql, params))
+        return get_cache_key('filter_choices', *parts)
+
+    def load_choices(self):
+        field = self.field
+        queryset = self.get_queryset(self.get_request())
+        if self.mode == 'frequency':
+            counts = self.parent.queryset.order_by().filter(**{
+                '%s__isnull' % self.field_name: False,
+            }).values_list(self.field_name).annotate(
+                count=Count('pk')).order_by('-count')
+            if self.limit:
+                counts = counts[:self.limit]
+            counts = list(counts)
+            objects = queryset.in_bulk(
+                [value for value, count in counts],
+                field_name=field.to_field_name or 'pk')
+            return [
+                (value, '%s (%d)' % (
+                    field.label_from_instance(objects[value]), count))
+                for value, count in counts if value in objects
+            ]
+        if self.limit:
+            queryset = queryset[:self.limit]
+        return [
+            (field.prepare_value(obj), field.label_from_instance(obj))
+            for obj in queryset
+        ]
+
+    def search_choices(self, term):
+        """Returns up to ``search_limit`` choices whose
+        ``search_fields`` contain every word of ``term``.
+        """
+        field = self.field
+        queryset = self.get_queryset(self.get_request())
+        for bit in term.split():
+            queryset = queryset.filter(reduce(operator.or_, [
+                Q(**{'%s__icontains' % search_field: bit})
+                for search_field in self.search_fields
+            ]))
+        return [
+            (field.prepare_value(obj), field.label_from_instance(obj))
+            for obj in queryset[:self.search_limit]
+        ]
+
+
 #: Maps `django_filter`'s field filters types to our
 #: custom form widget.
 FILTER_TYPE_TO_WIDGET = {
@@ -56,6 +242,11 @@ FILTER_TYPE_TO_WIDGET = {
 }
 
 
+#: Generated :class:`django_filters.FilterSet` classes by model and
+#: filter specification. Only the bound filterset is created per request.
+_filterset_cache = {}
+
+
 def build_list_filter(request, model_admin, queryset):
     """Builds :class:`~django_filters.FilterSet` instance
     for :attr:`djadmin2.ModelAdmin2.Meta.list_filter` option.
@@ -72,11 +263,26 @@ def build_list_filter(request, model_admin, queryset):
             queryset=queryset,
         )
     # otherwise build :mod:`django_filters.FilterSet`
+    filterset_class = get_list_filter_class(
+        queryset.model, model_admin.list_filter)
+    return filterset_class(request.GET, queryset=queryset)
+
+
+def get_list_filter_class(model, list_filter):
+    """Returns the :class:`django_filters.FilterSet` class for a
+    sequence of field names and filters. The class is built once
+    for every model and ``list_filter``.
+    """
+    key = ('list', model, tuple(list_filter))
+    try:
+        return _filterset_cache[key]
+    except KeyError:
+        pass
     filters = []
-    for field_filter in model_admin.list_filter:
+    for field_filter in list_filter:
         if isinstance(field_filter, str):
             filters.append(get_filter_for_field_name(
-                queryset.model,
+                model,
                 field_filter,
             ))
         else:
@@ -89,14 +295,34 @@ def build_list_filter(request, model_admin, queryset):
         type_str('Meta'),
         (),
         {
-            'model': queryset.model,
+            'model': model,
             'fields': fields,
         },
     )
-    return type(type_str('%sFilterSet' % queryset.model.__name__), (django_filters.FilterSet, ), filterset_dict,)(request.GET, queryset=queryset)
+    filterset_class = type(
+        type_str('%sFilterSet' % model.__name__),
+        (django_filters.FilterSet, ),
+        filterset_dict,
+    )
+    _filterset_cache[key] = filterset_class
+    return filterset_class
 
 
 def build_date_filter(request, model_admin, queryset, field_name="published_date"):
+    filterset_class = get_date_filter_class(queryset.model, field_name)
+    return filterset_class(request.GET, queryset=queryset)
+
+
+def get_date_filter_class(model, field_name):
+    """Returns the :class:`django_filters.FilterSet` class that
+    filters ``field_name`` by year, month and day. The class is
+    built once for every model and field.
+    """
+    key = ('date', model, field_name)
+    try:
+        return _filterset_cache[key]
+    except KeyError:
+        pass
     filterset_dict = {
         "year": NumericDateFilter(
             field_name=field_name,
@@ -114,14 +340,16 @@ def build_date_filter(request, model_admin, queryset, field_name="published_date
     filterset_dict["Meta"] = type(
         type_str('Meta'),
         (object, ),
-        {"model": queryset.model, "fields": [field_name]},
+        {"model": model, "fields": [field_name]},
     )
 
-    return type(
-        type_str('%sDateFilterSet' % queryset.model.__name__),
+    filterset_class = type(
+        type_str('%sDateFilterSet' % model.__name__),
         (django_filters.FilterSet,),
         filterset_dict,
-    )(request.GET, queryset=queryset)
+    )
+    _filterset_cache[key] = filterset_class
+    return filterset_class
 
 
 def get_filter_for_field_name(model, field_name):
@@ -131,8 +359,6 @@ def get_filter_for_field_name(model, field_name):
         django_filters.filterset.get_model_field(model, field_name,),
         field_name,
     )
-    print("EXTRA!!!!")
-    print(filter_.extra)
     filter_.widget = FILTER_TYPE_TO_WIDGET.get(
         filter_.__class__
     )
@@ -0,0 +1,276 @@
+import re
+from itertools import chain
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models.constants import LOOKUP_SEP
+from django.test.client import RequestFactory
+
+from djadmin2 import search, utils
+from djadmin2.site import djadmin2_site
+
+#: Lines of query plans that read a whole table or sort without an index.
+SCAN_PATTERNS = (
+    (re.compile(r'\bSCAN (TABLE )?\S+$'), 'reads the whole table'),
+    (re.compile(r'USE TEMP B-TREE FOR ORDER BY'), 'sorts without an index'),
+    (re.compile(r'Seq Scan on'), 'reads the whole table'),
+)
+
+
+class IndexNeed:
+    """
+    Columns of a table that a query of the list view filters or sorts by,
+    and that should start an index.
+    """
+
+    def __init__(self, reason, model, fields):
+        self.reason = reason
+        self.model = model
+        # The field names with "-" for descending columns
+        self.fields = fields
+
+    @property
+    def columns(self):
+        opts = utils.model_options(self.model)
+        return [opts.get_field(name.lstrip('-')).column for name in self.fields]
+
+    def is_covered(self, indexes):
+        columns = self.columns
+        return any(index[:len(columns)] == columns for index in indexes)
+
+    def get_index(self):
+        index = models.Index(fields=self.fields)
+        index.set_name_with_model(self.model)
+        return index
+
+
+def get_field(model, path):
+    """
+    Returns the model field at the end of a lookup path if it is a column
+    that an index can serve, else None.
+    """
+    try:
+        fields = utils.get_fields_from_path(model, path)
+    except FieldDoesNotExist:
+        return None
+    if not all(field.concrete and not field.many_to_many for field in fields):
+        return None
+    return fields[-1]
+
+
+def get_path_needs(reason, model, path):
+    """
+    Returns the :class:`IndexNeed` of a lookup path with an optional "-"
+    prefix, none if the path doesn't end in a column an index can serve.
+    """
+    field = get_field(model, path.lstrip('-'))
+    if field is None or field.primary_key:
+        return []
+    name = '-' + field.name if path.startswith('-') else field.name
+    return [IndexNeed(reason, field.model, [name])]
+
+
+def get_ordering_needs(model_admin):
+    model = model_admin.model
+    ordering = [name for name in (model_admin.ordering or [])
+                if isinstance(name, str) and name.lstrip('-') != 'pk']
+    # A composite index serves the ordering up to the first related field
+    local = []
+    for name in ordering:
+        if LOOKUP_SEP in name or get_field(model, name.lstrip('-')) is None:
+            break
+        local.append(name)
+    if len(local) > 1:
+        return [IndexNeed('ordering', model, local)]
+    if ordering:
+        return get_path_needs('ordering', model, ordering[0])
+    return []
+
+
+def get_list_filter_needs(model_admin):
+    if not isinstance(model_admin.list_filter, (list, tuple)):
+        return []
+    return [need for name in model_admin.list_filter if isinstance(name, str)
+            for need in get_path_needs('list_filter', model_admin.model, name)]
+
+
+def get_date_hierarchy_needs(model_admin):
+    if not model_admin.date_hierarchy:
+        return []
+    return get_path_needs(
+        'date_hierarchy', model_admin.model, model_admin.date_hierarchy)
+
+
+def get_sort_needs(model_admin):
+    model = model_admin.model
+    names = [name for name in model_admin.list_display
+             if isinstance(name, str) and name != '__str__']
+    return [need for name in names
+            if utils.get_lookup_path_info(model, name).sortable
+            for need in get_path_needs('sort by %s' % name, model, name)]
+
+
+def get_index_needs(model_admin):
+    """
+    Returns the :class:`IndexNeed` list of an admin: its ordering, list
+    filters, date hierarchy and the sortable columns of ``list_display``.
+    """
+    return list(chain(
+        get_ordering_needs(model_admin),
+        get_list_filter_needs(model_admin),
+        get_date_hierarchy_needs(model_admin),
+        get_sort_needs(model_admin)))
+
+
+def get_table_indexes(connection, table):
+    """
+    Returns the column lists of the indexes of a table, None if the table
+    doesn't exist.
+    """
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return None
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        constraint['columns'] for constraint in constraints.values()
+        if any(constraint[key] for key in ('index', 'unique', 'primary_key'))
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the queries of the list views of the registered admins with "
+        "their query plans, and the indexes that their ordering, filters, "
+        "date hierarchy and sortable columns miss.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_label', nargs='*',
+            help='Only report on the admins of these apps.')
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='The database to inspect.')
+        parser.add_argument(
+            '--no-explain', action='store_false', dest='explain',
+            help="Don't run EXPLAIN for the queries.")
+        parser.add_argument(
+            '--username',
+            help='Build the queries for this user instead of an anonymous '
+                 'one, for permissions that limit the rows of the list.')
+
+    def get_user(self, username):
+        if username is None:
+            return AnonymousUser()
+        User = get_user_model()
+        try:
+            return User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            raise CommandError('The user %s does not exist.' % username)
+
+    def handle(self, *args, **options):
+        djadmin2_site.autodiscover()
+        connection = connections[options['database']]
+        user = self.get_user(options['username'])
+        for model, model_admin in djadmin2_site.registry.items():
+            opts = utils.model_options(model)
+            if options['app_label'] and opts.app_label not in options['app_label']:
+                continue
+            self.stdout.write('%s (%s)' % (opts.label, type(model_admin).__name__))
+            if get_table_indexes(connection, opts.db_table) is None:
+                self.stdout.write('  The table %s does not exist.\n' % opts.db_table)
+                continue
+            self.report_queries(
+                model_admin, connection, options['explain'], user)
+            self.report_search(model_admin)
+            self.report_indexes(model_admin, connection)
+            self.stdout.write('')
+
+    def get_queries(self, model_admin, connection, user=None):
+        """
+        Returns the title and queryset of the page queries of the list view,
+        unsorted and sorted by each sortable column, as requested by the user
+        (an anonymous one by default).
+        """
+        factory = RequestFactory()
+
+        def get_view(query):
+            request = factory.get('/', query)
+            request.user = user or AnonymousUser()
+            return model_admin.index_view.view(
+                request=request, **model_admin.get_index_kwargs())
+
+        params = [('List page', {})]
+        for name in get_view({}).get_sort_columns():
+            params.append(('Sorted by %s' % name, {'sort': name}))
+
+        queries = []
+        for title, query in params:
+            view = get_view(query)
+            queryset = view.get_queryset().using(connection.alias)
+            queries.append((title, queryset[:model_admin.list_per_page]))
+        return queries
+
+    def report_queries(self, model_admin, connection, explain, user=None):
+        for title, queryset in self.get_queries(model_admin, connection, user):
+            self.stdout.write('  %s:' % title)
+            try:
+                self.stdout.write('    %s' % queryset.query)
+            except EmptyResultSet:
+                self.stdout.write("    The query can't return rows for the user.")
+                continue
+            if not explain:
+                continue
+            for line in queryset.explain().splitlines():
+                self.stdout.write('      %s' % line)
+                for pattern, problem in SCAN_PATTERNS:
+                    if pattern.search(line):
+                        self.stdout.write(self.style.WARNING(
+                            '      ! %s' % problem))
+
+    def report_search(self, model_admin):
+        backend = model_admin.get_search_backend()
+        if not model_admin.search_fields or not isinstance(
+                backend, search.LookupSearchBackend):
+            return
+        substring = [field for field in model_admin.search_fields
+                     if str(field)[:1] not in ('^', '=', '@')]
+        if substring:
+            self.stdout.write(self.style.WARNING(
+                "  ! The search of %s can't use an index, see "
+                "search_mode = 'trigram' and the admin2_trigram_indexes "
+                "command." % ', '.join(substring)))
+
+    def report_indexes(self, model_admin, connection):
+        indexes = {}
+        missing = []
+        for need in get_index_needs(model_admin):
+            table = utils.model_options(need.model).db_table
+            if table not in indexes:
+                indexes[table] = get_table_indexes(connection, table) or []
+            if not need.is_covered(indexes[table]):
+                missing.append(need)
+        if not missing:
+            self.stdout.write('  No missing indexes.')
+            return
+
+        self.stdout.write('  Missing indexes:')
+        for need in missing:
+            self.stdout.write(self.style.WARNING('    ! %s: %s (%s)' % (
+                need.reason, utils.model_options(need.model).db_table,
+                ', '.join(need.columns))))
+        # An index also serves the needs of the columns it starts with
+        suggested = {}
+        for need in sorted(missing, key=lambda need: -len(need.fields)):
+            needs = suggested.setdefault(need.model, [])
+            if not any(other.columns[:len(need.columns)] == need.columns
+                       for other in needs):
+                needs.append(need)
+        for model, needs in suggested.items():
+            self.stdout.write('  Suggested Meta.indexes of %s:' % model.__name__)
+            for need in needs:
+                index = need.get_index()
+                self.stdout.write('    models.Index(fields=%r, name=%r),' % (
+                    list(index.fields), index.name))
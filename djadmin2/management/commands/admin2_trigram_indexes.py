@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from djadmin2.search import TrigramSearchBackend
+from djadmin2.site import djadmin2_site
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the SQL of the trigram indexes that the registered admins "
+        "with search_mode = 'trigram' need, or creates them with --create.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--create', action='store_true',
+            help='Create the indexes instead of printing their SQL.')
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='The database to create the indexes in.')
+
+    def handle(self, *args, **options):
+        djadmin2_site.autodiscover()
+        connection = connections[options['database']]
+        for model, model_admin in djadmin2_site.registry.items():
+            backend = model_admin.get_search_backend()
+            if not isinstance(backend, TrigramSearchBackend):
+                continue
+            if options['create']:
+                backend.create_indexes(connection.alias)
+                self.stdout.write('Created the trigram indexes of %s' % (
+                    model._meta.label))
+            else:
+                for statement in backend.get_index_sql(connection):
+                    self.stdout.write('%s;' % statement)
@@ -0,0 +1,522 @@
+"""
+Pagination helpers for the ``ModelListView``.
+
+Django's ``Paginator`` pages with ``OFFSET``/``LIMIT`` and needs a
+``COUNT(*)`` to know how many pages there are. Both get slower the deeper
+you page and the bigger the table is. The ``KeysetPaginator`` in here pages
+with a cursor instead: it remembers the values of the ordering columns of the
+first/last row on the page and asks the database for the rows right before or
+after them. That way page N costs the same as page 1.
+
+For numbered pages the ``CountingPaginator`` lets the ``ModelAdmin2`` choose
+how the total number of results is computed (see ``COUNT_STRATEGIES``): an
+exact ``COUNT(*)``, a count that stops at a cap, or an estimate taken from the
+database statistics.
+"""
+import base64
+import binascii
+import collections.abc
+import datetime
+import decimal
+import json
+import operator
+import uuid
+from functools import reduce
+
+from django.core.exceptions import (FieldDoesNotExist, ImproperlyConfigured,
+                                    ValidationError)
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils import formats
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+
+from . import utils
+
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetCursorEncoder(json.JSONEncoder):
+    """
+    Encodes the values of the ordering columns of a row. Unlike
+    ``DjangoJSONEncoder`` this keeps the full precision of datetimes, since
+    the cursor must point exactly to the row it was taken from.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction, values], cls=KeysetCursorEncoder)
+    # The padding is stripped to keep the cursor URL safe
+    return force_str(base64.urlsafe_b64encode(data.encode('utf-8'))).rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        data = base64.urlsafe_b64decode((cursor + padding).encode('ascii'))
+        direction, values = json.loads(data.decode('utf-8'))
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise InvalidCursor('Invalid cursor: %r' % cursor)
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise InvalidCursor('Invalid cursor: %r' % cursor)
+    return direction, values
+
+
+def get_keyset_ordering(queryset):
+    """
+    Returns the effective ordering of the queryset as a list of
+    ``(lookup_path, descending)`` tuples. The primary key is appended as
+    tiebreaker if it is not part of the ordering already, so that the
+    ordering is total.
+    """
+    query = queryset.query
+    if query.order_by:
+        ordering = query.order_by
+    elif query.default_ordering:
+        ordering = queryset.model._meta.ordering
+    else:
+        ordering = ()
+
+    keys = []
+    for item in ordering:
+        if isinstance(item, OrderBy) and isinstance(item.expression, F):
+            keys.append((item.expression.name, item.descending))
+        elif isinstance(item, F):
+            keys.append((item.name, False))
+        elif isinstance(item, str) and item != '?':
+            if item.startswith('-'):
+                keys.append((item[1:], True))
+            else:
+                keys.append((item.lstrip('+'), False))
+        else:
+            raise ImproperlyConfigured(
+                'Keyset pagination does not support ordering by %r.' % item)
+
+    pk_names = ('pk', queryset.model._meta.pk.name)
+    for index, (name, descending) in enumerate(keys):
+        if name in pk_names:
+            return keys[:index + 1]
+    keys.append(('pk', False))
+    return keys
+
+
+class KeysetPage(collections.abc.Sequence):
+    """
+    A page of a ``KeysetPaginator``. It mimics the parts of Django's ``Page``
+    API that the templates use, but has cursors instead of page numbers.
+    """
+    cursor_based = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Keyset page of %s objects>' % len(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pages a queryset by seeking past the ordering values of the last row of
+    the previous page (``WHERE (a, b, pk) > (...) ORDER BY a, b, pk``)
+    instead of using ``OFFSET``. It never counts the rows.
+
+    ``NULL`` values are always sorted last, independent of the database
+    backend, so that the cursor comparisons are well defined.
+    """
+    alias_template = '_djadmin2_keyset_%d'
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = get_keyset_ordering(queryset)
+        self.aliases = [
+            self.alias_template % index for index in range(len(self.ordering))]
+
+    def parse_cursor(self, cursor=None):
+        """
+        Returns the direction and the ordering values of a cursor, or the
+        start of the list if there is no cursor.
+        """
+        if not cursor:
+            return NEXT, None
+        direction, values = decode_cursor(cursor)
+        if len(values) != len(self.ordering):
+            raise InvalidCursor('Cursor does not match the ordering.')
+        return direction, self.clean_values(values)
+
+    def get_field(self, name):
+        # The field whose values the ordering by a lookup path compares, the
+        # target field for relations
+        try:
+            field = utils.get_fields_from_path(self.queryset.model, name)[-1]
+        except FieldDoesNotExist:
+            return None
+        return getattr(field, 'target_field', field)
+
+    def clean_values(self, values):
+        """
+        Converts the ordering values of a cursor to the types of their
+        fields. A cursor is user input, a value of the wrong type must not
+        get as far as the query.
+        """
+        cleaned = []
+        for (name, descending), value in zip(self.ordering, values):
+            field = self.get_field(name)
+            if value is not None and field is not None:
+                try:
+                    value = field.to_python(value)
+                    field.get_prep_value(value)
+                except (TypeError, ValueError, ValidationError):
+                    raise InvalidCursor(
+                        'Invalid value for %s in the cursor.' % name)
+            cleaned.append(value)
+        return cleaned
+
+    def get_queryset(self, direction=NEXT, values=None):
+        """
+        Returns the queryset of the rows after (or before) the values, in
+        the order of the direction.
+        """
+        queryset = self.get_ordered_queryset(direction)
+        if values is not None:
+            queryset = queryset.filter(self.get_seek_filter(direction, values))
+        return queryset
+
+    def page(self, cursor=None):
+        direction, values = self.parse_cursor(cursor)
+        queryset = self.get_queryset(direction, values)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.get_next_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = encode_cursor(
+                PREVIOUS, self.get_row_values(rows[0]))
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    def get_ordered_queryset(self, direction):
+        queryset = self.queryset.annotate(**{
+            alias: F(name)
+            for alias, (name, descending) in zip(self.aliases, self.ordering)
+        })
+        order_by = []
+        for alias, (name, descending) in zip(self.aliases, self.ordering):
+            if direction == PREVIOUS:
+                descending = not descending
+                nulls = {'nulls_first': True}
+            else:
+                nulls = {'nulls_last': True}
+            if descending:
+                order_by.append(F(alias).desc(**nulls))
+            else:
+                order_by.append(F(alias).asc(**nulls))
+        return queryset.order_by(*order_by)
+
+    def get_seek_filter(self, direction, values):
+        """
+        Builds the lexicographic comparison ``(a, b, pk) > (x, y, z)`` as
+        ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND pk > z)``,
+        since row value comparisons are not portable.
+        """
+        conditions = []
+        equal_so_far = []
+        for alias, (name, descending), value in zip(
+                self.aliases, self.ordering, values):
+            beyond = self.get_beyond_filter(alias, descending, direction, value)
+            if beyond is not None:
+                conditions.append(reduce(operator.and_, equal_so_far + [beyond]))
+            if value is None:
+                equal_so_far.append(Q(**{'%s__isnull' % alias: True}))
+            else:
+                equal_so_far.append(Q(**{alias: value}))
+        if not conditions:
+            # Nothing can come after the cursor.
+            return Q(pk__in=[])
+        return reduce(operator.or_, conditions)
+
+    def get_beyond_filter(self, alias, descending, direction, value):
+        forward = direction == NEXT
+        if value is None:
+            # NULLs are sorted last, so nothing comes after them, but all
+            # non-NULL values come before them.
+            if forward:
+                return None
+            return Q(**{'%s__isnull' % alias: False})
+        lookup = 'lt' if descending == forward else 'gt'
+        condition = Q(**{'%s__%s' % (alias, lookup): value})
+        if forward:
+            condition |= Q(**{'%s__isnull' % alias: True})
+        return condition
+
+    def get_row_values(self, obj):
+        return [getattr(obj, alias) for alias in self.aliases]
+
+    def get_next_cursor(self, obj):
+        """
+        Returns the cursor of the rows after a row of the queryset.
+        """
+        return encode_cursor(NEXT, self.get_row_values(obj))
+
+
+class ResultCount(int):
+    """
+    The number of results of a list. ``capped`` is set if there are more
+    results than counted, ``estimated`` if the number is the database's guess.
+    """
+
+    def __new__(cls, value, capped=False, estimated=False):
+        count = super().__new__(cls, value)
+        count.capped = capped
+        count.estimated = estimated
+        return count
+
+    @property
+    def approximate(self):
+        return self.capped or self.estimated
+
+    def display(self):
+        number = formats.number_format(int(self), force_grouping=True)
+        if self.capped:
+            return '%s+' % number
+        if self.estimated:
+            return '~%s' % number
+        return number
+
+
+class ExactCount:
+    """
+    Counts all results with ``COUNT(*)``.
+    """
+
+    def __init__(self, cap=None):
+        self.cap = cap
+
+    def count(self, queryset):
+        return ResultCount(queryset.count())
+
+
+class CappedCount(ExactCount):
+    """
+    Counts the results only up to ``cap``. The database can stop scanning
+    after ``cap + 1`` rows, so the cost of the count is bounded.
+    """
+
+    def count(self, queryset):
+        if self.cap is None:
+            return super().count(queryset)
+        count = queryset.order_by()[:self.cap + 1].count()
+        if count > self.cap:
+            return ResultCount(self.cap, capped=True)
+        return ResultCount(count)
+
+
+class EstimatedCount(CappedCount):
+    """
+    Uses the row estimate of the database statistics instead of counting.
+
+    On PostgreSQL this reads ``pg_class.reltuples`` for an unfiltered list and
+    the planner estimate of ``EXPLAIN`` for a filtered one. On SQLite the
+    ``sqlite_stat1`` table (filled by ``ANALYZE``) is used for unfiltered
+    lists. If there is no estimate, the results are counted up to ``cap``.
+    Estimates below ``cap`` are replaced by an exact count, since the count is
+    cheap then.
+    """
+
+    def count(self, queryset):
+        estimate = self.estimate(queryset)
+        if estimate is None or (self.cap is not None and estimate < self.cap):
+            return super().count(queryset)
+        return ResultCount(estimate, estimated=True)
+
+    def estimate(self, queryset):
+        connection = connections[queryset.db]
+        query = queryset.query
+        sliced = query.low_mark or query.high_mark is not None
+        unfiltered = not any((query.where, query.distinct, sliced))
+        try:
+            if connection.vendor == 'postgresql':
+                if unfiltered:
+                    return self.estimate_postgresql_table(connection, queryset.model)
+                return self.estimate_postgresql_query(connection, queryset)
+            if connection.vendor == 'sqlite' and unfiltered:
+                return self.estimate_sqlite_table(connection, queryset.model)
+        except DatabaseError:
+            pass
+        return None
+
+    def estimate_postgresql_table(self, connection, model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(model._meta.db_table)])
+            row = cursor.fetchone()
+        # reltuples is -1 (or 0 on older versions) for never analyzed tables
+        if row is None or row[0] <= 0:
+            return None
+        return int(row[0])
+
+    def estimate_postgresql_query(self, connection, queryset):
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def estimate_sqlite_table(self, connection, model):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                [model._meta.db_table])
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return int(row[0].split()[0])
+
+
+#: Maps the names that can be used for ``ModelAdmin2.list_count`` to the
+#: count strategies.
+COUNT_STRATEGIES = {
+    'exact': ExactCount,
+    'capped': CappedCount,
+    'estimated': EstimatedCount,
+}
+
+
+def get_count_strategy(list_count, cap=None):
+    """
+    Returns the count strategy for the ``list_count`` option of a
+    ``ModelAdmin2``. It can be the name of a strategy, a strategy class or an
+    instance of one.
+    """
+    if isinstance(list_count, str):
+        try:
+            list_count = COUNT_STRATEGIES[list_count]
+        except KeyError:
+            raise ImproperlyConfigured(
+                'Unknown list_count %r, choose one of %s.' % (
+                    list_count, ', '.join(sorted(COUNT_STRATEGIES))))
+    if isinstance(list_count, type):
+        list_count = list_count(cap=cap)
+    return list_count
+
+
+class CountingPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next=None):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def __repr__(self):
+        if self.paginator.count.approximate:
+            return '<Page %s of %s>' % (
+                self.number, self.paginator.num_pages_display())
+        return super().__repr__()
+
+    def has_next(self):
+        if self._has_next is not None:
+            return self._has_next
+        return super().has_next()
+
+
+class CountingPaginator(Paginator):
+    """
+    A ``Paginator`` that gets the number of results from a count strategy.
+
+    If the count is approximate, pages beyond the counted number of results
+    can still be reached, whether there is a next page is then found out by
+    fetching one row more than needed.
+    """
+
+    def __init__(self, *args, count_strategy=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_strategy = count_strategy or ExactCount()
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return ResultCount(len(self.object_list))
+        return self.count_strategy.count(self.object_list)
+
+    def count_display(self):
+        return self.count.display()
+
+    def num_pages_display(self):
+        if self.count.capped:
+            return '%s+' % self.num_pages
+        if self.count.estimated:
+            return '~%s' % self.num_pages
+        return str(self.num_pages)
+
+    def validate_number(self, number):
+        if not self.count.approximate:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        if not self.count.approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return self._get_page(
+            object_list[:self.per_page], number, self,
+            has_next=len(object_list) > self.per_page)
+
+    def _get_page(self, *args, **kwargs):
+        return CountingPage(*args, **kwargs)
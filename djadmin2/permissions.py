@@ -17,7 +17,7 @@ which it can hold multiple.
 import logging
 import re
 
-from django.contrib.auth import get_permission_codename
+from django.contrib.auth import get_backends, get_permission_codename
 from django.db.utils import DEFAULT_DB_ALIAS
 from django.apps import apps
 from django.core.exceptions import ValidationError
@@ -87,7 +87,12 @@ def model_permission(permission):
         permission_name = permission.format(
             app_label=model_class._meta.app_label,
             model_name=model_name)
-        return request.user.has_perm(permission_name, obj)
+        if obj is not None:
+            return request.user.has_perm(permission_name, obj)
+        return has_cached_perm(request, permission_name)
+    # Lets get_permission_matrix answer the check from all permissions of
+    # the user
+    has_permission.permission = permission
     return has_permission
 
 
@@ -119,6 +124,15 @@ class BasePermission:
     def has_object_permission(self, request, view, obj):
         return self.has_permission(request, view, obj)
 
+    def filter_queryset(self, request, view, queryset):
+        '''
+        Returns the queryset limited to the rows that the user may access in
+        the view. The list, history and API views apply it, so that rows
+        without permission are never fetched. Returns the queryset unchanged
+        by default.
+        '''
+        return queryset
+
 
 class IsStaffPermission(BasePermission):
     '''
@@ -187,6 +201,72 @@ class ModelDeletePermission(BasePermission):
     permissions = (model_permission('{app_label}.delete_{model_name}'),)
 
 
+#: The permission classes whose checks :func:`get_permission_matrix` can
+#: answer from all permissions of the user. Subclasses may change
+#: ``has_permission`` and are asked themselves.
+BULK_PERMISSION_CLASSES = (
+    IsStaffPermission,
+    IsSuperuserPermission,
+    ModelPermission,
+    ModelViewPermission,
+    ModelAddPermission,
+    ModelChangePermission,
+    ModelDeletePermission,
+)
+
+
+class PermissionView:
+    '''
+    Stands in for a view of a model admin in the permission checks of the
+    ``TemplatePermissionChecker``, so that checking a permission in a
+    template doesn't instantiate the view. It has the ``request``, the
+    ``permissions`` of the view class and the attributes that the view would
+    get from ``get_default_view_kwargs()``, like ``model`` and
+    ``model_admin``.
+    '''
+
+    def __init__(self, request, view_class, **kwargs):
+        self.request = request
+        self.view_class = view_class
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.permissions = [
+            permission_class()
+            for permission_class in view_class.permission_classes]
+
+    def has_permission(self, obj=None):
+        for permission in self.permissions:
+            if not permission.has_permission(self.request, self, obj):
+                return False
+        return True
+
+
+def get_request_permission_cache(request):
+    '''
+    Returns the dictionary that keeps the permission decisions of the
+    current request and user. It is emptied when the user of the request
+    changes.
+    '''
+    user = getattr(request, 'user', None)
+    cache = getattr(request, '_djadmin2_permission_cache', None)
+    if cache is None or cache[0] is not user:
+        cache = (user, {})
+        try:
+            request._djadmin2_permission_cache = cache
+        except AttributeError:
+            pass
+    return cache[1]
+
+
+def get_object_cache_key(obj):
+    if obj is None:
+        return None
+    pk = getattr(obj, 'pk', None)
+    if pk is None:
+        return id(obj)
+    return (type(obj), pk)
+
+
 class TemplatePermissionChecker:
     '''
     Can be used in the template like:
@@ -268,6 +348,8 @@ class TemplatePermissionChecker:
         self._model_admin = model_admin
         self._view = view
         self._obj = obj
+        # The checkers that the keys of the template bind, by key
+        self._bound = {}
 
     def clone(self):
         return self.__class__(
@@ -305,11 +387,10 @@ class TemplatePermissionChecker:
         # tell which model admin it was attached to.
         else:
             return ''
-        # if view is a class and not instantiated yet, do it!
+        # Stand in for the view class, it is not instantiated for permission
+        # checks
         if isinstance(view, type):
-            view = view(
-                request=self._request,
-                **self._model_admin.get_default_view_kwargs())
+            view = self._get_permission_view(view)
         new_permissions = self.clone()
         new_permissions._view = view
         return new_permissions
@@ -326,7 +407,23 @@ class TemplatePermissionChecker:
     #########################################
     # interface exposed to the template users
 
+    def _get_permission_view(self, view_class):
+        cache = get_request_permission_cache(self._request)
+        key = ('view', id(self._model_admin), view_class)
+        if key not in cache:
+            cache[key] = (self._model_admin, PermissionView(
+                self._request, view_class,
+                **self._model_admin.get_default_view_kwargs()))
+        return cache[key][1]
+
     def __getitem__(self, key):
+        try:
+            return self._bound[key]
+        except KeyError:
+            self._bound[key] = bound = self._bind_key(key)
+            return bound
+
+    def _bind_key(self, key):
         match = self._has_named_permission_regex.match(key)
         if match:
             # the key was a has_*_permission, so bind the correspodning view
@@ -352,10 +449,17 @@ class TemplatePermissionChecker:
     def _cast_bool(self):
         if self._view is None:
             return False
-        if self._obj is None:
-            return self._view.has_permission()
-        else:
-            return self._view.has_permission(self._obj)
+        # The decisions are kept for the request, since a template checks
+        # the same permission for every row of a list
+        cache = get_request_permission_cache(self._request)
+        key = ('decision', id(self._view), get_object_cache_key(self._obj))
+        if key not in cache:
+            if self._obj is None:
+                decision = self._view.has_permission()
+            else:
+                decision = self._view.has_permission(self._obj)
+            cache[key] = (self._view, decision)
+        return cache[key][1]
 
     def __str__(self):
         if self._view is None:
@@ -363,6 +467,126 @@ class TemplatePermissionChecker:
         return force_str(bool(self))
 
 
+#: The permission checks that only depend on the user.
+USER_PERMISSION_CHECKS = (is_authenticated, is_staff, is_superuser)
+
+
+def has_cached_perm(request, permission_name):
+    '''
+    Returns ``request.user.has_perm(permission_name)``. Several permission
+    classes and views check the same model permission, so the
+    authentication backends are asked only once per request.
+    '''
+    cache = get_request_permission_cache(request)
+    key = ('perm', permission_name)
+    if key not in cache:
+        cache[key] = request.user.has_perm(permission_name)
+    return cache[key]
+
+
+def get_user_permissions(request):
+    '''
+    Returns the names of all model permissions of the user of the request,
+    asked from the authentication backends once per request. Returns None
+    if a backend is not a ``ModelBackend``: other backends, like the ones of
+    django-rules or django-guardian, may grant permissions in ``has_perm()``
+    that ``get_all_permissions()`` doesn't list.
+    '''
+    # Imported here, since the app config imports this module before the
+    # models are ready
+    from django.contrib.auth.backends import ModelBackend
+
+    cache = get_request_permission_cache(request)
+    if 'all_perms' not in cache:
+        if all(isinstance(backend, ModelBackend) for backend in get_backends()):
+            cache['all_perms'] = frozenset(request.user.get_all_permissions())
+        else:
+            cache['all_perms'] = None
+    return cache['all_perms']
+
+
+def has_user_permission(request, permission_name):
+    '''
+    Returns if the user of the request has the model permission, from
+    :func:`get_user_permissions` if the backends can list the permissions,
+    else from ``User.has_perm()``.
+    '''
+    user = request.user
+    if user.is_active and user.is_superuser:
+        return True
+    permissions = get_user_permissions(request)
+    if permissions is None:
+        return has_cached_perm(request, permission_name)
+    return permission_name in permissions
+
+
+def check_view_permissions(request, view_class, model):
+    '''
+    Returns if the user of the request may access a view of the model,
+    answered from the permissions of :func:`get_user_permissions`, or None
+    if a permission class of the view is not one of the model permission
+    classes of djadmin2 and has to be asked itself.
+    '''
+    user = request.user
+    for permission_class in view_class.permission_classes:
+        if permission_class not in BULK_PERMISSION_CLASSES:
+            return None
+        if not user:
+            return False
+        for check in permission_class().get_permission_checks(request, None):
+            if check in USER_PERMISSION_CHECKS:
+                granted = check(request, None)
+            elif hasattr(check, 'permission'):
+                opts = model._meta
+                permission_name = check.permission.format(
+                    app_label=opts.app_label, model_name=opts.model_name)
+                granted = has_user_permission(request, permission_name)
+            else:
+                return None
+            if not granted:
+                return False
+    return True
+
+
+def get_permission_matrix(request, model_admins, view_names=None):
+    '''
+    Returns the permissions of the user of the request for the views of many
+    model admins at once, like for the models of the dashboard. The result
+    maps the name of every admin to a dictionary of the view names (the keys
+    of ``TemplatePermissionChecker.view_name_mapping``, by default all of
+    them) to ``True`` or ``False``:
+
+    .. code-block:: python
+
+        {'blog_post': {'view': True, 'add': True, 'change': False}}
+
+    The model permissions are answered from the set of all permissions of
+    the user, which the authentication backends are asked for once, if they
+    are all ``ModelBackend`` subclasses. Otherwise every model permission is
+    asked from ``has_perm()`` once. Only the views with other permission
+    classes are checked per admin, like the ``TemplatePermissionChecker``
+    does.
+    '''
+    if view_names is None:
+        view_names = list(TemplatePermissionChecker.view_name_mapping)
+    matrix = {}
+    for model_admin in model_admins:
+        checker = None
+        permissions = matrix[model_admin.name] = {}
+        for view_name in view_names:
+            view_class = getattr(
+                model_admin,
+                TemplatePermissionChecker.view_name_mapping[view_name]).view
+            decision = check_view_permissions(
+                request, view_class, model_admin.model)
+            if decision is None:
+                if checker is None:
+                    checker = TemplatePermissionChecker(request, model_admin)
+                decision = bool(checker.bind_view(view_name))
+            permissions[view_name] = decision
+    return matrix
+
+
 def create_view_permissions(app_config, verbosity=2, interactive=True, using=DEFAULT_DB_ALIAS, **kwargs):  # noqa
     """
     Create 'view' permissions for all models.
@@ -4,13 +4,49 @@ are used by default for some field types.
 """
 import os.path
 from datetime import date, time, datetime
+from numbers import Number
 
+from django.core.exceptions import FieldDoesNotExist
+from django.core.signals import setting_changed
 from django.db import models
-from django.template.loader import render_to_string
+from django.db.models.constants import LOOKUP_SEP
+from django.dispatch import receiver
+from django.template.loader import get_template
 from django.utils import formats, timezone
 from django.utils.encoding import force_str
+from django.utils.translation import get_language
 
-from djadmin2 import settings
+from djadmin2 import settings, utils
+
+
+# Renderer templates by theme directory and template name, and the rendered
+# output for constant values. Renderers run for every cell of the list, so
+# the template loaders are only asked once per process.
+_template_cache = {}
+_output_cache = {}
+
+
+def get_renderer_template(template_name):
+    """
+    Returns the compiled renderer template of the current theme.
+
+    :param template_name: The name inside the theme directory, like
+        ``renderers/boolean.html``.
+    """
+    key = (settings.ADMIN2_THEME_DIRECTORY, template_name)
+    try:
+        return _template_cache[key]
+    except KeyError:
+        template = get_template(os.path.join(*key))
+        _template_cache[key] = template
+        return template
+
+
+@receiver(setting_changed)
+def clear_renderer_cache(setting, **kwargs):
+    if setting in ('ADMIN2_THEME_DIRECTORY', 'TEMPLATES'):
+        _template_cache.clear()
+        _output_cache.clear()
 
 
 def boolean_renderer(value, field):
@@ -26,9 +62,18 @@ def boolean_renderer(value, field):
     :rtype: unicode
 
     """
-    # TODO caching of template
-    tpl = os.path.join(settings.ADMIN2_THEME_DIRECTORY, 'renderers/boolean.html')
-    return render_to_string(tpl, {'value': value})
+    if value is True or value is False or value is None:
+        # The output only depends on the theme and the language then
+        key = (settings.ADMIN2_THEME_DIRECTORY, 'renderers/boolean.html',
+               value, get_language())
+        try:
+            return _output_cache[key]
+        except KeyError:
+            output = get_renderer_template(key[1]).render({'value': value})
+            _output_cache[key] = output
+            return output
+    return get_renderer_template('renderers/boolean.html').render(
+        {'value': value})
 
 
 def datetime_renderer(value, field):
@@ -79,3 +124,89 @@ def number_renderer(value, field):
     if isinstance(field, models.DecimalField):
         return formats.number_format(value, field.decimal_places)
     return formats.number_format(value)
+
+
+def get_renderer_for_value(value):
+    """
+    Picks the default renderer for a value, or returns None if the value
+    is shown as it is.
+    """
+    if isinstance(value, bool):
+        return boolean_renderer
+    elif isinstance(value, (date, time, datetime)):
+        return datetime_renderer
+    elif isinstance(value, Number):
+        return number_renderer
+    return None
+
+
+def get_renderer_for_field(field):
+    """
+    Picks the default renderer for the values of a model field. Returns
+    False if the field type doesn't tell and the value has to decide.
+    """
+    if isinstance(field, models.BooleanField):
+        return boolean_renderer
+    elif isinstance(field, (models.DateField, models.TimeField)):
+        return datetime_renderer
+    elif isinstance(field, (models.IntegerField, models.FloatField,
+                            models.DecimalField, models.AutoField)):
+        return number_renderer
+    elif isinstance(field, (models.CharField, models.TextField,
+                            models.ForeignKey, models.OneToOneField)):
+        return None
+    return False
+
+
+class ListColumn:
+    """
+    How a column of ``list_display`` gets its value and renders it. The
+    field and the renderer are looked up once, so rendering a cell doesn't
+    need any lookups.
+
+    :param model: The model of the list.
+    :param name: The name in ``list_display``.
+    :param renderer: The renderer of ``field_renderers``, ``None`` to show
+        the value as it is or ``False`` to pick the default renderer.
+    """
+
+    def __init__(self, model, name, renderer=False):
+        self.name = name
+        self.field = None
+        try:
+            self.field = utils.get_fields_from_path(model, name)[-1]
+        except FieldDoesNotExist:
+            # There is no field with the specified name.
+            # It must be a method instead.
+            pass
+        self.default_renderer = renderer is False
+        if self.default_renderer and self.field is not None:
+            renderer = get_renderer_for_field(self.field)
+        self.renderer = renderer
+
+        local = self.field is not None and LOOKUP_SEP not in name
+        if local and self.field.concrete:
+            self.get_value = self.get_field_value
+        else:
+            self.get_value = self.get_attr_value
+
+    def get_field_value(self, obj):
+        return getattr(obj, self.name)
+
+    def get_attr_value(self, obj):
+        return utils.get_attr(obj, self.name)
+
+    def render(self, obj):
+        """
+        Returns the rendered value of the column for the given object.
+        """
+        value = self.get_value(obj)
+        renderer = self.renderer
+        if self.default_renderer:
+            if value is None:
+                return value
+            if renderer is False:
+                renderer = get_renderer_for_value(value)
+        if renderer is None:
+            return value
+        return renderer(value, self.field)
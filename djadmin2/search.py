@@ -0,0 +1,622 @@
+"""
+Search backends for the search box of the list view. A backend gets the list
+queryset and the search term and returns the searched queryset. Which
+backend a :class:`djadmin2.types.ModelAdmin2` uses is set with its
+``search_mode`` or ``search_backend`` attributes.
+"""
+import operator
+from functools import reduce
+
+from django.core.cache import caches
+from django.core.exceptions import (EmptyResultSet, FieldDoesNotExist,
+                                    ImproperlyConfigured)
+from django.db import connections, models, router
+from django.db.backends.utils import truncate_name
+from django.db.models.expressions import Col, RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.utils.encoding import force_str
+
+from . import settings, utils
+
+
+def get_search_field_name(search_field):
+    """
+    Returns the field name of a ``search_fields`` entry without the
+    ``^``, ``=`` or ``@`` prefix.
+    """
+    search_field = str(search_field)
+    if search_field[:1] in ('^', '=', '@'):
+        return search_field[1:]
+    return search_field
+
+
+class BaseSearchBackend:
+    """
+    Base class of the search backends.
+
+    :param model_admin: The :class:`djadmin2.types.ModelAdmin2` whose
+        ``search_fields`` are searched.
+    """
+    #: The database vendors that the backend works with, None for all.
+    vendors = None
+
+    #: How rows that a search finds more than once are removed, see
+    #: ``search_distinct_mode`` of :class:`djadmin2.types.ModelAdmin2`.
+    distinct_modes = ('distinct', 'subquery', 'exists')
+
+    def __init__(self, model_admin):
+        self.model_admin = model_admin
+        self.model = model_admin.model
+        self.distinct_mode = getattr(
+            model_admin, 'search_distinct_mode', 'distinct')
+        if self.distinct_mode not in self.distinct_modes:
+            raise ImproperlyConfigured(
+                "Unknown search_distinct_mode %r, use one of %s." % (
+                    self.distinct_mode, ', '.join(self.distinct_modes)))
+
+    @property
+    def search_fields(self):
+        return self.model_admin.search_fields
+
+    def check_vendor(self, queryset):
+        vendor = connections[queryset.db].vendor
+        if self.vendors is not None and vendor not in self.vendors:
+            raise ImproperlyConfigured(
+                "%s doesn't work with the %s database of %s." % (
+                    type(self).__name__, vendor, self.model.__name__))
+
+    def lookup_needs_distinct(self, lookup_path):
+        """
+        Returns True if filtering by the lookup path can return a row more
+        than once.
+        """
+        return utils.get_lookup_path_info(
+            self.model, lookup_path).needs_distinct
+
+    def needs_distinct(self):
+        """
+        Returns True if searching the ``search_fields`` can return a row
+        more than once, because a path follows a many-to-many relation.
+        """
+        return any(
+            self.lookup_needs_distinct(get_search_field_name(field))
+            for field in self.search_fields)
+
+    @property
+    def cache_timeout(self):
+        return getattr(self.model_admin, 'search_cache_timeout', 0)
+
+    @property
+    def stopwords(self):
+        stopwords = getattr(self.model_admin, 'search_stopwords', None)
+        if stopwords is None:
+            stopwords = settings.ADMIN2_SEARCH_STOPWORDS
+        return stopwords
+
+    def normalize_search_term(self, search_term):
+        """
+        Returns the search term with every word once, without stopwords and
+        with at most ``search_max_terms`` words.
+        """
+        stopwords = {word.lower() for word in self.stopwords}
+        max_terms = getattr(self.model_admin, 'search_max_terms', None)
+        bits = []
+        seen = set()
+        for bit in search_term.split():
+            key = bit.lower()
+            if key in seen or key in stopwords:
+                continue
+            seen.add(key)
+            bits.append(bit)
+        return ' '.join(bits[:max_terms])
+
+    def get_cache_key(self, queryset, search_term):
+        """
+        Returns the cache key of the primary keys that a search of the
+        queryset finds, or None if the queryset can't find anything.
+        """
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        return utils.get_cache_key(
+            'search', type(self.model_admin).__module__,
+            type(self.model_admin).__name__, self.model._meta.label,
+            queryset.db, sql, params, search_term)
+
+    def get_cached_pks(self, queryset, search_term):
+        """
+        Returns the primary keys that a search of the queryset finds, from
+        the cache if the same search was done within
+        ``search_cache_timeout`` seconds. Returns None if the search finds
+        more than ``search_cache_max_results`` rows, which are not cached.
+        """
+        key = self.get_cache_key(queryset, search_term)
+        if key is None:
+            return None
+        cache = caches[settings.ADMIN2_CACHE]
+        pks = cache.get(key)
+        if pks is None:
+            max_results = getattr(
+                self.model_admin, 'search_cache_max_results', 500)
+            results, use_distinct = self.get_uncached_search_results(
+                queryset, search_term)
+            pks = results.order_by().values_list('pk', flat=True)
+            if use_distinct:
+                pks = pks.distinct()
+            pks = list(pks[:max_results + 1])
+            if len(pks) > max_results:
+                # Too many to cache, False stands for a search to redo
+                pks = False
+            cache.set(key, pks, self.cache_timeout)
+        return pks if pks is not False else None
+
+    def get_search_results(self, queryset, search_term):
+        """
+        Returns the queryset filtered by the normalized search term and
+        whether the list has to use ``distinct()``.
+
+        With a ``search_cache_timeout`` the primary keys of the rows found
+        are cached, so that paging through the results of the same search
+        is a ``pk IN (...)`` condition instead of a search per page.
+        """
+        search_term = self.normalize_search_term(search_term)
+        if not search_term:
+            return queryset, False
+        if self.cache_timeout:
+            pks = self.get_cached_pks(queryset, search_term)
+            if pks is not None:
+                return queryset.filter(pk__in=pks), False
+        return self.get_uncached_search_results(queryset, search_term)
+
+    def get_uncached_search_results(self, queryset, search_term):
+        """
+        Returns the queryset filtered by the search term and whether the
+        list has to use ``distinct()``. With the ``"subquery"`` and
+        ``"exists"`` distinct modes a search that finds rows more than once
+        becomes a subquery, so that the list itself needs no ``distinct()``.
+        """
+        results, use_distinct = self.search(queryset, search_term)
+        if not use_distinct or self.distinct_mode == 'distinct':
+            return results, use_distinct
+        searched, use_distinct = self.search(
+            self.model._default_manager.all(), search_term)
+        if self.distinct_mode == 'exists':
+            return queryset.filter(
+                models.Exists(searched.filter(pk=models.OuterRef('pk')))), False
+        return queryset.filter(pk__in=searched.values('pk')), False
+
+    def search(self, queryset, search_term):
+        """
+        Returns the queryset filtered by the search term and whether the
+        list has to use ``distinct()``.
+        """
+        raise NotImplementedError
+
+
+class LookupSearchBackend(BaseSearchBackend):
+    """
+    Searches with a lookup per search field, ``icontains`` unless the
+    field starts with ``^`` (``istartswith``), ``=`` (``iexact``) or ``@``
+    (``search``). Every word of the term has to match one of the fields.
+    """
+
+    def construct_search(self, field_name):
+        # Lifted from django.contrib.admin
+        if field_name.startswith('^'):
+            return "%s__istartswith" % field_name[1:]
+        elif field_name.startswith('='):
+            return "%s__iexact" % field_name[1:]
+        elif field_name.startswith('@'):
+            return "%s__search" % field_name[1:]
+        else:
+            return "%s__icontains" % field_name
+
+    def search(self, queryset, search_term):
+        orm_lookups = [self.construct_search(str(search_field))
+                       for search_field in self.search_fields]
+
+        for bit in search_term.split():
+            or_queries = [models.Q(**{orm_lookup: bit})
+                          for orm_lookup in orm_lookups]
+            queryset = queryset.filter(reduce(operator.or_, or_queries))
+
+        return queryset, self.needs_distinct()
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL full text search. Without ``search_vector_field`` the
+    ``search_fields`` are turned into a ``SearchVector`` for every query.
+    For big tables store the vector in a ``SearchVectorField`` with a GIN
+    index, or add an index for the expression with
+    :meth:`get_index`, and name the field in ``search_vector_field``.
+    The ``search_config`` of the admin is the text search configuration,
+    like ``"english"``.
+    """
+    vendors = ('postgresql',)
+    search_type = 'plain'
+
+    @property
+    def config(self):
+        return getattr(self.model_admin, 'search_config', None)
+
+    @property
+    def vector_field(self):
+        return getattr(self.model_admin, 'search_vector_field', None)
+
+    def get_vector(self):
+        from django.contrib.postgres.search import SearchVector
+        if self.vector_field:
+            return models.F(self.vector_field)
+        fields = [get_search_field_name(field) for field in self.search_fields]
+        return SearchVector(*fields, config=self.config)
+
+    def search(self, queryset, search_term):
+        self.check_vendor(queryset)
+        from django.contrib.postgres.search import SearchQuery
+        query = SearchQuery(
+            search_term, config=self.config, search_type=self.search_type)
+        if self.vector_field:
+            return queryset.filter(**{self.vector_field: query}), False
+        queryset = queryset.annotate(
+            _djadmin2_search=self.get_vector()).filter(_djadmin2_search=query)
+        return queryset, self.needs_distinct()
+
+    @classmethod
+    def get_index(cls, fields, name, config=None):
+        """
+        Returns a GIN index for the search vector of the given local
+        fields, for the ``indexes`` of the model's ``Meta``. ``config``
+        must be the ``search_config`` of the admin, or the index isn't
+        used.
+        """
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+        return GinIndex(SearchVector(*fields, config=config), name=name)
+
+
+#: The models whose rows are copied to a shadow table, by model.
+_shadow_backends = {}
+
+
+def _sync_shadow_row(sender, instance, raw=False, using=None, **kwargs):
+    backend = _shadow_backends.get(sender)
+    if backend is not None and not raw:
+        backend.sync_row(instance, using)
+
+
+def _delete_shadow_row(sender, instance, using=None, **kwargs):
+    backend = _shadow_backends.get(sender)
+    if backend is not None:
+        backend.delete_row(instance, using)
+
+
+class ShadowTableSearchBackend(BaseSearchBackend):
+    """
+    Base class of backends that search a separate table with a copy of the
+    ``search_fields`` of every row. The table is created and filled on first
+    use, and the ``post_save`` and ``post_delete`` signals keep it in sync
+    afterwards. Changes that don't send signals, like ``update()`` and
+    ``bulk_create()``, need a :meth:`rebuild`.
+    """
+
+    def __init__(self, model_admin):
+        super().__init__(model_admin)
+        self.fields = []
+        for search_field in self.search_fields:
+            try:
+                field = utils.model_options(self.model).get_field(
+                    get_search_field_name(search_field))
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.concrete or field.is_relation:
+                raise ImproperlyConfigured(
+                    "%s can only search local fields of %s, not %r." % (
+                        type(self).__name__, self.model.__name__,
+                        search_field))
+            self.fields.append(field)
+
+        _shadow_backends[self.model] = self
+        uid = 'djadmin2_shadow_table_%s' % self.model._meta.label_lower
+        post_save.connect(
+            _sync_shadow_row, sender=self.model, weak=False,
+            dispatch_uid=uid)
+        post_delete.connect(
+            _delete_shadow_row, sender=self.model, weak=False,
+            dispatch_uid=uid)
+
+    @property
+    def table_name(self):
+        return '%s_search' % self.model._meta.db_table
+
+    def get_connection(self, using=None):
+        return connections[using or router.db_for_write(self.model)]
+
+    def quote_name(self, connection):
+        return connection.ops.quote_name(self.table_name)
+
+    def table_exists(self, connection):
+        raise NotImplementedError
+
+    def create_table(self, connection):
+        raise NotImplementedError
+
+    def ensure_table(self, connection):
+        if not self.table_exists(connection):
+            self.create_table(connection)
+            self.rebuild(connection.alias)
+
+    def get_row(self, instance):
+        return [force_str(field.value_from_object(instance) or '')
+                for field in self.fields]
+
+    def rebuild(self, using=None):
+        """
+        Fills the shadow table again from the model's table.
+        """
+        connection = self.get_connection(using)
+        if not self.table_exists(connection):
+            self.create_table(connection)
+        table = self.quote_name(connection)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in self.fields)
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % table)
+            cursor.execute('INSERT INTO %s (rowid, %s) SELECT %s, %s FROM %s' % (
+                table, columns,
+                connection.ops.quote_name(self.model._meta.pk.column),
+                columns,
+                connection.ops.quote_name(self.model._meta.db_table)))
+
+    def sync_row(self, instance, using=None):
+        raise NotImplementedError
+
+    def delete_row(self, instance, using=None):
+        connection = self.get_connection(using)
+        if self.table_exists(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'DELETE FROM %s WHERE rowid = %%s' % self.quote_name(connection),
+                    [instance.pk])
+
+
+class SQLiteFTS5SearchBackend(ShadowTableSearchBackend):
+    """
+    SQLite full text search with an FTS5 table that shadows the
+    ``search_fields``. Every word of the term has to occur in the row as
+    a word or as the start of a word.
+    """
+    vendors = ('sqlite',)
+
+    def table_exists(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [self.table_name])
+            return cursor.fetchone() is not None
+
+    def create_table(self, connection):
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in self.fields)
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE VIRTUAL TABLE %s USING fts5(%s)' % (
+                self.quote_name(connection), columns))
+
+    def sync_row(self, instance, using=None):
+        connection = self.get_connection(using)
+        if connection.vendor not in self.vendors:
+            return
+        self.ensure_table(connection)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in self.fields)
+        placeholders = ', '.join(['%s'] * (len(self.fields) + 1))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO %s (rowid, %s) VALUES (%s)' % (
+                    self.quote_name(connection), columns, placeholders),
+                [instance.pk] + self.get_row(instance))
+
+    def delete_row(self, instance, using=None):
+        if self.get_connection(using).vendor in self.vendors:
+            super().delete_row(instance, using)
+
+    def get_match_query(self, search_term):
+        # Quote every word so that FTS5 doesn't parse its syntax
+        return ' '.join(
+            '"%s"*' % bit.replace('"', '""') for bit in search_term.split())
+
+    def search(self, queryset, search_term):
+        self.check_vendor(queryset)
+        match = self.get_match_query(search_term)
+        if not match:
+            return queryset, False
+        connection = connections[queryset.db]
+        self.ensure_table(connection)
+        table = self.quote_name(connection)
+        return queryset.filter(pk__in=RawSQL(
+            'SELECT rowid FROM %s WHERE %s MATCH %%s' % (table, table),
+            [match])), False
+
+
+def get_trigrams(value):
+    """
+    Returns the set of the lowercase three letter substrings of a value.
+    """
+    value = value.lower()
+    return {value[ix:ix + 3] for ix in range(len(value) - 2)}
+
+
+class TrigramSearchBackend(ShadowTableSearchBackend):
+    """
+    Substring search (``icontains``) that uses trigram indexes. Every word
+    of the term has to occur in one of the ``search_fields``, which must be
+    fields of the model itself.
+
+    On PostgreSQL ``icontains`` compares ``UPPER("column"::text)``, so the
+    GIN indexes with the ``gin_trgm_ops`` operator class of the ``pg_trgm``
+    extension are built on that expression rather than on the column, see
+    :meth:`get_index_sql` and the ``admin2_trigram_indexes`` command. On
+    SQLite the trigrams of every row are kept in a side table, which narrows
+    a search down to the rows that have all trigrams of the word before
+    ``icontains`` checks them. Words shorter than three letters have no
+    trigram and are searched without the index.
+    """
+    vendors = ('postgresql', 'sqlite')
+
+    @property
+    def table_name(self):
+        return '%s_trigram' % self.model._meta.db_table
+
+    def get_index_name(self, connection, field):
+        return truncate_name(
+            '%s_%s_trgm' % (self.model._meta.db_table, field.column),
+            connection.ops.max_name_length())
+
+    def get_lookup_sql(self, connection, field, alias=None):
+        """
+        Returns the SQL of the side of the ``icontains`` lookups of the search
+        that holds the field, like ``UPPER("title"::text)`` on PostgreSQL.
+        """
+        compiler = self.model._default_manager.all().query.get_compiler(
+            connection=connection)
+        lookup = field.get_lookup('icontains')(Col(alias, field), '')
+        sql, params = lookup.process_lhs(compiler, connection)
+        return sql
+
+    def get_index_sql(self, connection):
+        """
+        Returns the SQL statements that create the indexes of the search.
+        """
+        qn = connection.ops.quote_name
+        if connection.vendor == 'postgresql':
+            statements = ['CREATE EXTENSION IF NOT EXISTS pg_trgm']
+            for field in self.fields:
+                # An index on the bare column can't serve the lookups
+                statements.append(
+                    'CREATE INDEX IF NOT EXISTS %s ON %s USING gin ((%s) gin_trgm_ops)' % (
+                        qn(self.get_index_name(connection, field)),
+                        qn(self.model._meta.db_table),
+                        self.get_lookup_sql(connection, field)))
+            return statements
+        table = self.quote_name(connection)
+        return [
+            'CREATE TABLE IF NOT EXISTS %s (trigram TEXT NOT NULL, '
+            'object_id INTEGER NOT NULL)' % table,
+            'CREATE INDEX IF NOT EXISTS %s ON %s (trigram, object_id)' % (
+                qn('%s_idx' % self.table_name), table),
+        ]
+
+    def create_indexes(self, using=None):
+        """
+        Creates the indexes of the search, on SQLite also fills the side
+        table.
+        """
+        connection = self.get_connection(using)
+        if connection.vendor == 'sqlite':
+            self.rebuild(connection.alias)
+            return
+        with connection.cursor() as cursor:
+            for statement in self.get_index_sql(connection):
+                cursor.execute(statement)
+
+    def table_exists(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [self.table_name])
+            return cursor.fetchone() is not None
+
+    def create_table(self, connection):
+        with connection.cursor() as cursor:
+            for statement in self.get_index_sql(connection):
+                cursor.execute(statement)
+
+    def get_row_trigrams(self, values):
+        trigrams = set()
+        for value in values:
+            trigrams.update(get_trigrams(force_str(value or '')))
+        return trigrams
+
+    def rebuild(self, using=None):
+        connection = self.get_connection(using)
+        if not self.table_exists(connection):
+            self.create_table(connection)
+        table = self.quote_name(connection)
+        rows = self.model._default_manager.using(connection.alias).values_list(
+            'pk', *[field.attname for field in self.fields])
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % table)
+            for row in rows.iterator():
+                cursor.executemany(
+                    'INSERT INTO %s (trigram, object_id) VALUES (%%s, %%s)' % table,
+                    [(trigram, row[0])
+                     for trigram in self.get_row_trigrams(row[1:])])
+
+    def sync_row(self, instance, using=None):
+        connection = self.get_connection(using)
+        if connection.vendor != 'sqlite':
+            return
+        self.ensure_table(connection)
+        self.delete_row(instance, using)
+        table = self.quote_name(connection)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO %s (trigram, object_id) VALUES (%%s, %%s)' % table,
+                [(trigram, instance.pk) for trigram in self.get_row_trigrams(
+                    field.value_from_object(instance) for field in self.fields)])
+
+    def delete_row(self, instance, using=None):
+        connection = self.get_connection(using)
+        if connection.vendor == 'sqlite' and self.table_exists(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'DELETE FROM %s WHERE object_id = %%s' % self.quote_name(connection),
+                    [instance.pk])
+
+    def get_candidates(self, connection, word):
+        """
+        Returns the SQL of the primary keys of the rows that have all
+        trigrams of the word, or None if the word is too short.
+        """
+        trigrams = sorted(get_trigrams(word))
+        if not trigrams:
+            return None
+        return RawSQL(
+            'SELECT object_id FROM %s WHERE trigram IN (%s) '
+            'GROUP BY object_id HAVING COUNT(*) = %%s' % (
+                self.quote_name(connection), ', '.join(['%s'] * len(trigrams))),
+            trigrams + [len(trigrams)])
+
+    def search(self, queryset, search_term):
+        self.check_vendor(queryset)
+        connection = connections[queryset.db]
+        if connection.vendor == 'sqlite':
+            self.ensure_table(connection)
+        for bit in search_term.split():
+            if connection.vendor == 'sqlite':
+                candidates = self.get_candidates(connection, bit)
+                if candidates is not None:
+                    queryset = queryset.filter(pk__in=candidates)
+            queryset = queryset.filter(reduce(operator.or_, [
+                models.Q(**{'%s__icontains' % field.name: bit})
+                for field in self.fields]))
+        return queryset, False
+
+
+#: The backends for the ``search_mode`` of :class:`djadmin2.types.ModelAdmin2`.
+SEARCH_BACKENDS = {
+    'lookup': LookupSearchBackend,
+    'postgres': PostgresSearchBackend,
+    'fts5': SQLiteFTS5SearchBackend,
+    'trigram': TrigramSearchBackend,
+}
+
+
+def get_search_backend_class(search_mode):
+    try:
+        return SEARCH_BACKENDS[search_mode]
+    except KeyError:
+        raise ImproperlyConfigured(
+            "Unknown search_mode %r, use one of %s." % (
+                search_mode, ', '.join(sorted(SEARCH_BACKENDS))))
@@ -10,6 +10,24 @@ MODEL_ADMIN_ATTRS = (
     'field_renderers', 'index_view', 'detail_view', 'create_view',
     'update_view', 'delete_view', 'get_default_view_kwargs',
     'get_list_actions', 'get_ordering', 'actions_on_bottom', 'actions_on_top',
-    'ordering', 'save_on_top', 'save_on_bottom', 'readonly_fields', )
+    'ordering', 'save_on_top', 'save_on_bottom', 'readonly_fields',
+    'pagination', 'list_count', 'list_count_cap', 'list_select_related',
+    'list_prefetch_related', 'list_str_fields', 'list_defer',
+    'get_list_column', 'date_hierarchy_counts',
+    'date_hierarchy_cache_timeout', 'get_search_backend',
+    'autocomplete_search_fields', 'autocomplete_limit',
+    'autocomplete_cache_timeout', 'str_ordering', 'list_max_show_all',
+    'rows_view', )
 
 ADMIN2_THEME_DIRECTORY = getattr(settings, "ADMIN2_THEME_DIRECTORY", "djadmin2theme_bootstrap3")
+
+# The cache that django-admin2 uses, like for the choices of list filters
+ADMIN2_CACHE = getattr(settings, "ADMIN2_CACHE", "default")
+
+# The words that the search box ignores, see search_stopwords of ModelAdmin2
+ADMIN2_SEARCH_STOPWORDS = getattr(settings, "ADMIN2_SEARCH_STOPWORDS", ())
+
+# How many seconds djadmin2.backends.CachedPermissionBackend keeps the
+# permissions of a user in the ADMIN2_CACHE cache
+ADMIN2_PERMISSION_CACHE_TIMEOUT = getattr(
+    settings, "ADMIN2_PERMISSION_CACHE_TIMEOUT", 60 * 60)
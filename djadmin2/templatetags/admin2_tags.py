@@ -1,10 +1,8 @@
-from numbers import Number
-from datetime import date, time, datetime
-
 from django import template
 from django.core.exceptions import FieldDoesNotExist
+from django.http import QueryDict
 
-from .. import utils, renderers, models, settings
+from .. import utils, models, settings
 
 
 register = template.Library()
@@ -55,6 +53,9 @@ def model_attr_verbose_name(obj, attr):
     """
     Returns the verbose name of a model field or method.
     """
+    info = utils.get_lookup_path_info(utils.model_options(obj).model, attr)
+    if info.verbose_name is not None:
+        return info.verbose_name
     try:
         return utils.model_field_verbose_name(obj, attr)
     except FieldDoesNotExist:
@@ -109,38 +110,41 @@ def for_object(permissions, obj):
     return permissions.bind_object(obj)
 
 
+@register.filter
+def permissions_for(permission_matrix, admin):
+    """
+    Returns the permissions of a model admin from the ``permission_matrix``
+    of the index views, a dictionary of view names like ``add`` to booleans.
+    """
+    if not permission_matrix:
+        return {}
+    return permission_matrix.get(admin.name, {})
+
+
 @register.simple_tag(takes_context=True)
 def render(context, model_instance, attribute_name):
     """
     This filter applies all renderers specified in admin2.py to the field.
     """
-    value = utils.get_attr(model_instance, attribute_name)
-
-    # Get renderer
     admin = context['view'].model_admin
-    renderer = admin.field_renderers.get(attribute_name, False)
-    if renderer is None:
-        # Renderer has explicitly been overridden
-        return value
-    if not renderer:
-        # Try to automatically pick best renderer
-        if isinstance(value, bool):
-            renderer = renderers.boolean_renderer
-        elif isinstance(value, (date, time, datetime)):
-            renderer = renderers.datetime_renderer
-        elif isinstance(value, Number):
-            renderer = renderers.number_renderer
-        else:
-            return value
+    return admin.get_list_column(attribute_name).render(model_instance)
 
-    # Apply renderer and return value
-    try:
-        field = model_instance._meta.get_field(attribute_name)
-    except FieldDoesNotExist:
-        # There is no field with the specified name.
-        # It must be a method instead.
-        field = None
-    return renderer(value, field)
+
+@register.simple_tag(takes_context=True)
+def query_string(context, **kwargs):
+    """
+    Returns the query string of the current request with the given
+    parameters replaced. Parameters set to ``None`` are removed. Useful for
+    pagination links that must keep the active search, filters and sorting.
+    """
+    request = context.get('request')
+    params = request.GET.copy() if request is not None else QueryDict(mutable=True)
+    for key, value in kwargs.items():
+        if value is None:
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return '?' + params.urlencode()
 
 
 @register.inclusion_tag(
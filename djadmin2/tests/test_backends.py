@@ -0,0 +1,70 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from .. import settings
+from ..backends import invalidate_permissions
+
+
+@override_settings(AUTHENTICATION_BACKENDS=[
+    'djadmin2.backends.CachedPermissionBackend'])
+class CachedPermissionBackendTest(TestCase):
+
+    def setUp(self):
+        caches[settings.ADMIN2_CACHE].clear()
+        self.user = User.objects.create(username='admin', is_staff=True)
+        self.group = Group.objects.create(name='editors')
+        self.add_user = Permission.objects.get(codename='add_user')
+        self.change_user = Permission.objects.get(codename='change_user')
+
+    def get_user(self):
+        # A new user object, like the one of the next request
+        return User.objects.get(pk=self.user.pk)
+
+    def test_permissions_are_cached(self):
+        self.user.user_permissions.add(self.add_user)
+        self.assertTrue(self.get_user().has_perm('auth.add_user'))
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('auth.add_user'))
+            self.assertFalse(user.has_perm('auth.change_user'))
+            self.assertTrue(user.has_module_perms('auth'))
+
+    def test_user_permissions_invalidate(self):
+        self.assertFalse(self.get_user().has_perm('auth.add_user'))
+        self.user.user_permissions.add(self.add_user)
+        self.assertTrue(self.get_user().has_perm('auth.add_user'))
+        self.add_user.user_set.remove(self.user)
+        self.assertFalse(self.get_user().has_perm('auth.add_user'))
+
+    def test_groups_invalidate(self):
+        self.group.permissions.add(self.change_user)
+        self.assertFalse(self.get_user().has_perm('auth.change_user'))
+        self.group.user_set.add(self.user)
+        self.assertTrue(self.get_user().has_perm('auth.change_user'))
+        self.group.permissions.clear()
+        self.assertFalse(self.get_user().has_perm('auth.change_user'))
+        self.group.permissions.add(self.change_user)
+        self.assertTrue(self.get_user().has_perm('auth.change_user'))
+        self.group.delete()
+        self.assertFalse(self.get_user().has_perm('auth.change_user'))
+
+    def test_inactive_user(self):
+        self.user.user_permissions.add(self.add_user)
+        self.assertTrue(self.get_user().has_perm('auth.add_user'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.get_user().has_perm('auth.add_user'))
+
+    def test_lost_version(self):
+        self.user.user_permissions.add(self.add_user)
+        self.assertTrue(self.get_user().has_perm('auth.add_user'))
+        caches[settings.ADMIN2_CACHE].delete('djadmin2:permissions:version')
+        user = self.get_user()
+        # The user and the group permissions are loaded again
+        with self.assertNumQueries(2):
+            self.assertTrue(user.has_perm('auth.add_user'))
+        invalidate_permissions()
+        user = self.get_user()
+        with self.assertNumQueries(2):
+            self.assertTrue(user.has_perm('auth.add_user'))
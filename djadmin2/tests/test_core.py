@@ -5,6 +5,7 @@ from django.test import TestCase
 
 from djadmin2.site import djadmin2_site
 from .models import SmallThing
+from .. import utils
 from ..core import Admin2
 from ..types import ModelAdmin2
 
@@ -28,6 +29,20 @@ class Admin2Test(TestCase):
         self.admin2.deregister(SmallThing)
         self.assertTrue(SmallThing not in self.admin2.registry)
 
+    def test_register_lookup_paths(self):
+        class SmallThingAdmin(ModelAdmin2):
+            list_display = ('id', '__str__')
+
+        self.admin2.register(SmallThing, SmallThingAdmin)
+        self.addCleanup(utils.deregister_lookup_paths, SmallThing)
+        info = utils.get_lookup_path_info(SmallThing, 'id')
+        self.assertIs(utils._lookup_registry[SmallThing]['id'], info)
+        self.assertFalse(
+            utils.get_lookup_path_info(SmallThing, '__str__').sortable)
+
+        self.admin2.deregister(SmallThing)
+        self.assertNotIn(SmallThing, utils._lookup_registry)
+
     def test_deregister_error(self):
         self.assertRaises(ImproperlyConfigured, self.admin2.deregister, SmallThing)
 
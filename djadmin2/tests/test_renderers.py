@@ -1,11 +1,11 @@
 import datetime as dt
 from decimal import Decimal
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils.translation import activate
 
-from .. import renderers
-from .models import RendererTestModel
+from .. import renderers, settings
+from .models import RendererTestModel, UtilsTestModel
 
 
 class BooleanRendererTest(TestCase):
@@ -25,6 +25,21 @@ class BooleanRendererTest(TestCase):
         out2 = self.renderer('', None)
         self.assertIn('fa fa-minus', out2)
 
+    def test_none(self):
+        self.assertIn('fa fa-minus', self.renderer(None, None))
+
+    def test_template_cache(self):
+        template = renderers.get_renderer_template('renderers/boolean.html')
+        self.assertIn(
+            (settings.ADMIN2_THEME_DIRECTORY, 'renderers/boolean.html'),
+            renderers._template_cache)
+        self.assertIs(
+            renderers.get_renderer_template('renderers/boolean.html'),
+            template)
+        with override_settings(ADMIN2_THEME_DIRECTORY='djadmin2theme_other'):
+            self.assertEqual(renderers._template_cache, {})
+            self.assertEqual(renderers._output_cache, {})
+
 
 class DatetimeRendererTest(TestCase):
 
@@ -113,3 +128,33 @@ class NumberRendererTest(TestCase):
         field = RendererTestModel._meta.get_field('decimal')
         out = self.renderer(Decimal('0.123456789'), field)
         self.assertEqual('0.12345', out)
+
+
+class ListColumnTest(TestCase):
+
+    def test_field_renderer(self):
+        column = renderers.ListColumn(RendererTestModel, 'decimal')
+        self.assertEqual(column.renderer, renderers.number_renderer)
+        self.assertEqual(
+            column.render(RendererTestModel(decimal=Decimal('1.5'))), '1.50000')
+        self.assertIsNone(column.render(RendererTestModel(decimal=None)))
+
+    def test_method_renderer(self):
+        column = renderers.ListColumn(UtilsTestModel, 'was_published_recently')
+        self.assertIsNone(column.field)
+        self.assertIs(column.renderer, False)
+        self.assertIn('title="True"', column.render(UtilsTestModel()))
+        column = renderers.ListColumn(UtilsTestModel, 'simple_method')
+        self.assertEqual(column.render(UtilsTestModel()), '42')
+
+    def test_explicit_renderer(self):
+        column = renderers.ListColumn(
+            UtilsTestModel, 'field1', renderers.title_renderer)
+        self.assertEqual(column.render(UtilsTestModel(field1='ab cd')), 'Ab Cd')
+        column = renderers.ListColumn(UtilsTestModel, 'simple_method', None)
+        self.assertEqual(column.render(UtilsTestModel()), 42)
+
+    def test_plain_field(self):
+        column = renderers.ListColumn(UtilsTestModel, 'field1')
+        self.assertIsNone(column.renderer)
+        self.assertEqual(column.render(UtilsTestModel(field1='text')), 'text')
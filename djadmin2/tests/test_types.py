@@ -30,6 +30,11 @@ class ImmutableAdminFactoryTests(TestCase):
             # can't delete attribute
             del self.immutable_admin.a
 
+    def test_class_is_shared(self):
+        self.assertIs(
+            type(immutable_admin_factory(ModelAdmin)),
+            type(self.immutable_admin))
+
     def test_attributes(self):
         self.assertEqual(self.immutable_admin.a, 1)
         self.assertEqual(self.immutable_admin.b, 2)
@@ -61,9 +66,25 @@ class ModelAdminTest(TestCase):
             admin_instance.get_index_kwargs().keys()
         )
 
+    def test_immutable_admin_is_built_once(self):
+        admin_instance = ModelAdmin2(BigThing, Admin2)
+        immutable_admin = admin_instance.get_immutable_admin()
+        self.assertIs(
+            admin_instance.get_default_view_kwargs()['model_admin'],
+            immutable_admin)
+
+        admin_instance.list_display = ('__str__', 'id')
+        self.assertEqual(
+            admin_instance.get_immutable_admin().list_display, ('__str__',))
+        admin_instance.invalidate_immutable_admin()
+        self.assertEqual(
+            admin_instance.get_immutable_admin().list_display,
+            ('__str__', 'id'))
+        self.assertIsNot(admin_instance.get_immutable_admin(), immutable_admin)
+
     def test_get_urls(self):
         admin_instance = ModelAdmin2(BigThing, Admin2)
-        self.assertEqual(6, len(admin_instance.get_urls()))
+        self.assertEqual(7, len(admin_instance.get_urls()))
 
     def test_get_urls_throws_type_error(self):
         with self.assertRaises(TypeError):
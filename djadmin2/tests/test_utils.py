@@ -149,3 +149,19 @@ class UtilsTest(TestCase):
             utils.get_attr(Klass(), "attr"),
             "value"
         )
+
+    def test_lookup_path_info_of_field(self):
+        info = utils.LookupPathInfo(UtilsTestModel, 'field2')
+        self.assertEqual(
+            info.fields, [UtilsTestModel._meta.get_field('field2')])
+        self.assertEqual(info.verbose_name, 'second field')
+        self.assertTrue(info.sortable)
+        self.assertFalse(info.needs_distinct)
+
+    def test_lookup_path_info_of_method(self):
+        info = utils.LookupPathInfo(UtilsTestModel, 'was_published_recently')
+        self.assertIsNone(info.fields)
+        self.assertEqual(info.verbose_name, 'Published recently?')
+        self.assertFalse(info.sortable)
+        self.assertIsNone(
+            utils.LookupPathInfo(UtilsTestModel, 'missing').verbose_name)
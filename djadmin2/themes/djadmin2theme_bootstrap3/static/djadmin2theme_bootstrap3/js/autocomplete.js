@@ -0,0 +1,42 @@
+$(function() {
+    var form = $(".model-search form");
+    var autocompleteUrl = form.data('autocomplete-url');
+    var input = form.find('input[name="q"]');
+    var results = form.find('.search-autocomplete-results');
+    var timeout = null;
+    var request = null;
+
+    if (!autocompleteUrl) {
+        return;
+    }
+
+    var showResults = function(objects) {
+        results.empty();
+        for (var ix = 0; ix < objects.length; ix++) {
+            results.append($('<li>').append($('<a>')
+                .attr('href', objects[ix].url)
+                .text(objects[ix].label)));
+        }
+        results.toggle(objects.length > 0);
+    };
+
+    input.on('input', function(e) {
+        var term = $.trim(input.val());
+        clearTimeout(timeout);
+        if (request) {
+            request.abort();
+        }
+        if (term.length < 2) {
+            showResults([]);
+            return;
+        }
+        timeout = setTimeout(function() {
+            request = $.getJSON(autocompleteUrl, {q: term}, showResults);
+        }, 250);
+    });
+
+    input.on('blur', function(e) {
+        // Give a click on a result the time to follow the link
+        setTimeout(function() { results.hide(); }, 200);
+    });
+});
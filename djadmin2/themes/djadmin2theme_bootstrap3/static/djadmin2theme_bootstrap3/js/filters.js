@@ -0,0 +1,29 @@
+$(function() {
+    var form = $("#filter_form");
+    var choicesUrl = form.data('choices-url');
+    var timeout = null;
+
+    var showChoices = function(input, choices) {
+        var results = input.next('.filter-typeahead-results');
+        results.empty();
+        for (var ix = 0; ix < choices.length; ix++) {
+            var params = {};
+            params[input.data('field')] = choices[ix].value;
+            results.append($('<a>')
+                .attr('href', '?' + $.param(params))
+                .text(choices[ix].label));
+            results.append('<br />');
+        }
+    };
+
+    form.find('.filter-typeahead').on('input', function(e) {
+        var input = $(this);
+        clearTimeout(timeout);
+        timeout = setTimeout(function() {
+            var url = choicesUrl.replace('__field__', input.data('field'));
+            $.getJSON(url, {q: input.val()}, function(choices) {
+                showChoices(input, choices);
+            });
+        }, 250);
+    });
+});
@@ -0,0 +1,11 @@
+$(function() {
+    $('#model-list').on('click', '.load-more a', function(e) {
+        var link = $(this);
+        var row = link.closest('tr');
+        e.preventDefault();
+        link.text('...');
+        $.get(link.data('rows-url'), function(rows) {
+            row.replaceWith(rows);
+        });
+    });
+});
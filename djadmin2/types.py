@@ -2,6 +2,7 @@ import logging
 import os
 import sys
 from collections import namedtuple
+from itertools import chain
 
 import extra_views
 from django.forms import modelform_factory
@@ -9,6 +10,8 @@ from django.urls import re_path, reverse
 
 from . import actions
 from . import apiviews
+from . import renderers
+from . import search
 from . import settings
 from . import utils
 from . import views
@@ -54,14 +57,56 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
 
     actions_selection_counter = True
     date_hierarchy = False
+    # Show the number of results next to the dates of the drilldown, and
+    # how many seconds to cache them
+    date_hierarchy_counts = False
+    date_hierarchy_cache_timeout = 0
     list_display = ("__str__",)
     list_display_links = ()
     list_filter = ()
+    # True, False (derive it from list_display) or a list of relations
     list_select_related = False
+    # Reverse foreign key and many-to-many relations used by list_display
+    list_prefetch_related = ()
+    # Fields that __str__ uses, which lets the list load only the columns it
+    # shows, and fields that are never loaded for the list
+    list_str_fields = None
+    list_defer = ()
     list_per_page = 100
     list_max_show_all = 200
+    # Either "page" (numbered pages) or "keyset" (cursor based)
+    pagination = "page"
+    # How the results are counted: "exact", "capped" or "estimated", see
+    # djadmin2.pagination.COUNT_STRATEGIES
+    list_count = "exact"
+    list_count_cap = 10000
     list_editable = ()
     search_fields = ()
+    # Either "lookup", "postgres" or "fts5", see djadmin2.search, or a
+    # search backend class in search_backend
+    search_mode = "lookup"
+    search_backend = None
+    # How a search over many-to-many relations avoids duplicate rows:
+    # "distinct", or "subquery" and "exists" which keep the list query
+    # free of DISTINCT
+    search_distinct_mode = "distinct"
+    # The words of a search term are used once and at most search_max_terms
+    # of them, without search_stopwords (by default ADMIN2_SEARCH_STOPWORDS).
+    # With a search_cache_timeout the primary keys of the rows found are
+    # cached, unless there are more than search_cache_max_results of them.
+    search_stopwords = None
+    search_max_terms = 10
+    search_cache_timeout = 0
+    search_cache_max_results = 500
+    # The search as you type of the search box: the fields whose start is
+    # matched (by default the search_fields), the number of results and how
+    # many seconds to cache them
+    autocomplete_search_fields = None
+    autocomplete_limit = 10
+    autocomplete_cache_timeout = 30
+    # Options of the "postgres" search mode
+    search_config = None
+    search_vector_field = None
     save_as = False
     save_on_top = False
     verbose_name = None
@@ -104,6 +149,9 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
     formfield_overrides = {}
     readonly_fields = ()
     ordering = None
+    # The lookup paths (with "-" for descending) that sorting the list by its
+    # __str__ column orders by, by default the ordering of the admin
+    str_ordering = None
 
     create_form_class = None
     update_form_class = None
@@ -125,6 +173,7 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
     history_view = views.AdminView(
         r"^(?P<pk>[0-9]+)/history/$", views.ModelHistoryView, name="history"
     )
+    rows_view = views.AdminView(r"^rows/$", views.ModelListRowsView, name="rows")
     views = []
 
     # API configuration
@@ -133,6 +182,8 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
     # API Views
     api_list_view = apiviews.ListCreateAPIView
     api_detail_view = apiviews.RetrieveUpdateDestroyAPIView
+    api_filter_choices_view = apiviews.FilterChoicesAPIView
+    api_autocomplete_view = apiviews.AutocompleteAPIView
 
     def __init__(self, model, admin, name=None, **kwargs):
         self.name = name
@@ -150,12 +201,41 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
         if self.verbose_name_plural is None:
             self.verbose_name_plural = model_options.verbose_name_plural
 
+        search_backend = self.search_backend
+        if search_backend is None:
+            search_backend = search.get_search_backend_class(self.search_mode)
+        self._search_backend = search_backend(self)
+
+        self._list_columns = {}
+        for name in self.list_display:
+            self.get_list_column(name)
+
+    def get_immutable_admin(self):
+        """
+        Returns the ImmutableAdmin that the views of this admin get. It is
+        built once, call :meth:`invalidate_immutable_admin` after changing
+        one of the ``model_admin_attributes`` of the admin.
+        """
+        try:
+            return self._immutable_admin
+        except AttributeError:
+            self._immutable_admin = immutable_admin_factory(self)
+            return self._immutable_admin
+
+    def invalidate_immutable_admin(self):
+        """
+        Makes the next :meth:`get_immutable_admin` call build a new
+        ImmutableAdmin. Views that have been created already keep the old
+        one.
+        """
+        self.__dict__.pop("_immutable_admin", None)
+
     def get_default_view_kwargs(self):
         return {
             "app_label": self.app_label,
             "model": self.model,
             "model_name": self.model_name,
-            "model_admin": immutable_admin_factory(self),
+            "model_admin": self.get_immutable_admin(),
         }
 
     def get_index_kwargs(self):
@@ -167,6 +247,9 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
         )
         return kwargs
 
+    def get_rows_kwargs(self):
+        return self.get_index_kwargs()
+
     def get_default_api_view_kwargs(self):
         kwargs = self.get_default_view_kwargs()
         kwargs.update(
@@ -224,6 +307,12 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
     def get_api_detail_kwargs(self):
         return self.get_default_api_view_kwargs()
 
+    def get_api_filter_choices_kwargs(self):
+        return self.get_default_view_kwargs()
+
+    def get_api_autocomplete_kwargs(self):
+        return self.get_default_view_kwargs()
+
     def get_urls(self):
         pattern_list = []
         for admin_view in self.views:
@@ -267,6 +356,20 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
                 view=self.api_detail_view.as_view(**self.get_api_detail_kwargs()),
                 name=self.get_prefixed_view_name("api_detail"),
             ),
+            re_path(
+                r"^filters/(?P<field_name>\w+)/$",
+                view=self.api_filter_choices_view.as_view(
+                    **self.get_api_filter_choices_kwargs()
+                ),
+                name=self.get_prefixed_view_name("api_filter_choices"),
+            ),
+            re_path(
+                r"^autocomplete/$",
+                view=self.api_autocomplete_view.as_view(
+                    **self.get_api_autocomplete_kwargs()
+                ),
+                name=self.get_prefixed_view_name("api_autocomplete"),
+            ),
         ]
 
     @property
@@ -294,6 +397,49 @@ class ModelAdmin2(metaclass=ModelAdminBase2):
     def get_ordering(self, request):
         return self.ordering
 
+    def get_lookup_paths(self):
+        """
+        Returns the lookup paths of the model that the admin uses, to be
+        resolved once when it is registered.
+        """
+        paths = []
+        for name in chain(self.list_display, self.list_display_links):
+            if isinstance(name, str):
+                paths.append(name)
+        paths.extend(search.get_search_field_name(search_field)
+                     for search_field in self.search_fields)
+        if isinstance(self.list_filter, (list, tuple)):
+            paths.extend(name for name in self.list_filter
+                         if isinstance(name, str))
+        for ordering in (self.ordering, self.str_ordering):
+            if ordering:
+                paths.extend(name.lstrip('-') for name in ordering
+                             if isinstance(name, str))
+        if self.date_hierarchy:
+            paths.append(self.date_hierarchy)
+        return paths
+
+    def get_search_backend(self):
+        """
+        Returns the :class:`djadmin2.search.BaseSearchBackend` that searches
+        the list.
+        """
+        return self._search_backend
+
+    def get_list_column(self, name):
+        """
+        Returns the :class:`djadmin2.renderers.ListColumn` that renders the
+        values of a ``list_display`` entry. Columns are built once and
+        shared by all rows and requests.
+        """
+        try:
+            return self._list_columns[name]
+        except KeyError:
+            column = renderers.ListColumn(
+                self.model, name, self.field_renderers.get(name, False))
+            self._list_columns[name] = column
+            return column
+
 
 class Admin2Inline(extra_views.InlineFormSetFactory):
     """
@@ -327,6 +473,24 @@ class Admin2StackedInline(Admin2Inline):
     )
 
 
+#: The ImmutableAdmin classes by their attribute names, since making a
+#: namedtuple class is slow.
+_immutable_admin_classes = {}
+
+
+def get_immutable_admin_class(attributes):
+    """
+    Returns the ImmutableAdmin namedtuple class with the given attributes.
+    """
+    attributes = tuple(attributes)
+    try:
+        return _immutable_admin_classes[attributes]
+    except KeyError:
+        cls = namedtuple("ImmutableAdmin", attributes)
+        _immutable_admin_classes[attributes] = cls
+        return cls
+
+
 def immutable_admin_factory(model_admin):
     """
     Provide an ImmutableAdmin to make it harder for developers to
@@ -338,7 +502,7 @@ def immutable_admin_factory(model_admin):
     the result, but hopefully developers attempting that
     'workaround/hack' will read our documentation.
     """
-    ImmutableAdmin = namedtuple("ImmutableAdmin", model_admin.model_admin_attributes)
+    ImmutableAdmin = get_immutable_admin_class(model_admin.model_admin_attributes)
     return ImmutableAdmin(
         *[getattr(model_admin, x) for x in model_admin.model_admin_attributes]
     )
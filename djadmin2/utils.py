@@ -1,4 +1,6 @@
+import hashlib
 from collections import defaultdict
+from itertools import chain
 
 from django.core.exceptions import FieldDoesNotExist
 from django.db.models.constants import LOOKUP_SEP
@@ -37,6 +39,15 @@ def lookup_needs_distinct(opts, lookup_path):
     return False
 
 
+def get_cache_key(prefix, *parts):
+    """
+    Returns a cache key for values that depend on the given parts, like the
+    SQL and the parameters of a query.
+    """
+    digest = hashlib.md5(force_bytes(repr(parts))).hexdigest()
+    return 'djadmin2:%s:%s' % (prefix, digest)
+
+
 def model_options(model):
     """
     Wrapper for accessing model._meta. If this access point changes in core
@@ -69,12 +80,175 @@ def model_verbose_name_plural(model):
     return model_options(model).verbose_name_plural
 
 
+def get_fields_from_path(model, path):
+    """
+    Returns the chain of fields that the lookup path (like ``post__title``)
+    traverses, starting at the given model. Raises ``FieldDoesNotExist`` if
+    one of the names is not a field.
+    """
+    fields = []
+    opts = model_options(model)
+    for field_name in path.split(LOOKUP_SEP):
+        if opts is None:
+            raise FieldDoesNotExist(
+                "%s has no relation to follow to %s" % (fields[-1], field_name))
+        if field_name == 'pk':
+            field_name = opts.pk.name
+        field = opts.get_field(field_name)
+        fields.append(field)
+        related_model = getattr(field, 'related_model', None)
+        opts = model_options(related_model) if related_model else None
+    return fields
+
+
+def _is_single_relation(field):
+    # A foreign key or one-to-one relation, which select_related() can join
+    if not field.is_relation or field.related_model is None:
+        return False
+    return field.many_to_one and field.concrete or field.one_to_one
+
+
+def get_list_select_related(model, list_display):
+    """
+    Returns the ``select_related`` paths that are needed to render the
+    columns of ``list_display`` without a query per row. That are all forward
+    foreign key and one-to-one relations, also when traversed with ``__``.
+    """
+    select_related = []
+    for name in list_display:
+        if not isinstance(name, str) or name == '__str__':
+            continue
+        opts = model_options(model)
+        path = []
+        for field_name in name.split(LOOKUP_SEP):
+            try:
+                field = opts.get_field(field_name)
+            except FieldDoesNotExist:
+                break
+            if not _is_single_relation(field):
+                break
+            path.append(field_name)
+            opts = model_options(field.related_model)
+        if path:
+            lookup = LOOKUP_SEP.join(path)
+            if lookup not in select_related:
+                select_related.append(lookup)
+    return select_related
+
+
+def _get_column_names(list_display, str_fields):
+    # The lookup paths of the columns, None if a column isn't a path
+    names = []
+    for name in list_display:
+        if name == '__str__':
+            if str_fields is None:
+                return None
+            names.extend(str_fields)
+        elif isinstance(name, str):
+            names.append(name)
+        else:
+            return None
+    return names
+
+
+def _get_column_paths(model, names):
+    """
+    Returns the paths of the fields that the columns load and the paths of
+    the relations that are shown as a column, or None if a column isn't
+    made of concrete fields.
+    """
+    paths = []
+    complete = []
+    for name in names:
+        try:
+            fields = get_fields_from_path(model, name)
+        except FieldDoesNotExist:
+            return None
+        path = []
+        for field in fields:
+            if field.many_to_many or field.one_to_many:
+                # Prefetched, there is no column to load
+                break
+            if not field.concrete:
+                return None
+            path.append(field.name)
+            paths.append(LOOKUP_SEP.join(path))
+        else:
+            if fields[-1].is_relation:
+                complete.append(LOOKUP_SEP.join(path))
+    return paths, complete
+
+
+def _get_ordering_paths(model, ordering):
+    # The local fields of the ordering, ordering by a related field joins
+    # without loading it
+    paths = []
+    for name in ordering:
+        if not isinstance(name, str) or LOOKUP_SEP in name.lstrip('-'):
+            continue
+        try:
+            field = get_fields_from_path(model, name.lstrip('-'))[-1]
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.many_to_many:
+            paths.append(field.name)
+    return paths
+
+
+def _get_select_related_paths(select_related):
+    # The relations and the relations they traverse
+    paths = []
+    for lookup in select_related:
+        names = lookup.split(LOOKUP_SEP)
+        for index in range(len(names)):
+            paths.append(LOOKUP_SEP.join(names[:index + 1]))
+    return paths
+
+
+def get_list_only_fields(model, list_display, str_fields=None,
+                         ordering=(), select_related=()):
+    """
+    Returns the field names to pass to ``only()`` so that the list loads just
+    the columns that it renders. Returns None if that can't be determined,
+    which is the case for model methods in ``list_display`` and for the
+    ``__str__`` column if ``str_fields`` doesn't tell which fields it needs.
+
+    Relations shown as a column are loaded completely, relations that are
+    only traversed (like ``post`` for ``post__title``) just with the fields
+    that are asked for.
+    """
+    names = _get_column_names(list_display, str_fields)
+    if names is None:
+        return None
+    columns = _get_column_paths(model, names)
+    if columns is None:
+        return None
+    paths, complete = columns
+
+    only = []
+    for path in chain(
+            [model_options(model).pk.name], paths,
+            _get_ordering_paths(model, ordering),
+            _get_select_related_paths(select_related)):
+        if path not in only:
+            only.append(path)
+    return [
+        path for path in only
+        if not any(path.startswith(relation + LOOKUP_SEP)
+                   for relation in complete)
+    ]
+
+
 def model_field_verbose_name(model, field_name):
     """
-    Returns the verbose name of a model field.
+    Returns the verbose name of a model field. Follows relations for lookup
+    paths like ``post__title``.
     """
     meta = model_options(model)
-    field = meta.get_field(field_name)
+    if LOOKUP_SEP in field_name:
+        field = get_fields_from_path(model, field_name)[-1]
+    else:
+        field = meta.get_field(field_name)
     return field.verbose_name
 
 
@@ -89,6 +263,79 @@ def model_method_verbose_name(model, method_name):
         return method_name
 
 
+class LookupPathInfo:
+    """
+    What django-admin2 needs to know about a lookup path (like ``title``,
+    ``post__title`` or the name of a method) of a model.
+
+    :fields: The chain of model fields of the path, or None for methods.
+    :needs_distinct: If filtering by the path can return a row twice.
+    :verbose_name: The name of the field or method, None if the path is
+        neither.
+    :sortable: If the list can be sorted by the path.
+    """
+    __slots__ = ('path', 'fields', 'needs_distinct', 'verbose_name',
+                 'sortable')
+
+    def __init__(self, model, path):
+        self.path = path
+        try:
+            self.fields = get_fields_from_path(model, path)
+        except FieldDoesNotExist:
+            self.fields = None
+        if self.fields is None:
+            self.needs_distinct = False
+            self.sortable = False
+            try:
+                self.verbose_name = model_method_verbose_name(model, path)
+            except AttributeError:
+                self.verbose_name = None
+        else:
+            self.needs_distinct = lookup_needs_distinct(
+                model_options(model), path)
+            self.verbose_name = self.fields[-1].verbose_name if hasattr(
+                self.fields[-1], 'verbose_name') else None
+            self.sortable = not self.needs_distinct and all(
+                field.concrete for field in self.fields)
+
+
+#: The :class:`LookupPathInfo` of the lookup paths that the registered model
+#: admins use, by model and path.
+_lookup_registry = {}
+
+
+def register_lookup_paths(model, paths):
+    """
+    Resolves the lookup paths of a model once, usually when its admin is
+    registered.
+    """
+    infos = _lookup_registry.setdefault(model, {})
+    for path in paths:
+        if path not in infos:
+            infos[path] = LookupPathInfo(model, path)
+
+
+def deregister_lookup_paths(model):
+    """
+    Forgets the lookup paths of a model, when its admin is deregistered.
+    """
+    _lookup_registry.pop(model, None)
+
+
+def get_lookup_path_info(model, path):
+    """
+    Returns the :class:`LookupPathInfo` of a lookup path. Paths of models
+    that aren't registered are resolved every time.
+    """
+    try:
+        return _lookup_registry[model][path]
+    except KeyError:
+        info = LookupPathInfo(model, path)
+        if model in _lookup_registry:
+            _lookup_registry[model][path] = info
+        return info
+
+
 def model_app_label(obj):
     """
     Returns the app label of a model instance or class.
@@ -104,6 +351,13 @@ def get_attr(obj, attr):
     if attr == '__str__':
         from builtins import str as text
         value = text(obj)
+    elif LOOKUP_SEP in attr and not hasattr(obj, attr):
+        # Follow the relations of lookup paths like ``post__title``
+        value = obj
+        for name in attr.split(LOOKUP_SEP):
+            if value is None:
+                break
+            value = get_attr(value, name)
     else:
         attribute = getattr(obj, attr)
         value = attribute() if callable(attribute) else attribute
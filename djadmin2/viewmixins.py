@@ -44,6 +44,19 @@ class PermissionMixin(AccessMixin):
                 return False
         return True
 
+    def filter_permitted_queryset(self, queryset):
+        '''
+        Returns the queryset limited to the rows that the permission classes
+        of the view let the user access, see
+        ``BasePermission.filter_queryset``.
+        '''
+        for permission in self.permissions:
+            # The permission classes of django-rest-framework don't filter
+            filter_queryset = getattr(permission, 'filter_queryset', None)
+            if filter_queryset is not None:
+                queryset = filter_queryset(self.request, self, queryset)
+        return queryset
+
     def dispatch(self, request, *args, **kwargs):
         # Raise exception or redirect to login if user doesn't have
         # permissions.
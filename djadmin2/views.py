@@ -1,9 +1,9 @@
-import operator
+import os
+import uuid
 from datetime import datetime
-from functools import reduce
+from itertools import chain, islice
 
 import extra_views
-from django.core.exceptions import FieldDoesNotExist
 from django.conf import settings
 from django.contrib.auth import (logout as auth_logout,
                                  update_session_auth_hash)
@@ -11,9 +11,15 @@ from django.contrib.auth.forms import (PasswordChangeForm,
                                        AdminPasswordChangeForm)
 from django.contrib.auth.views import LoginView as DjangoLoginView
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
 from django.db import models, router
-from django.http import HttpResponseRedirect
+from django.db.models import prefetch_related_objects
+from django.db.models.functions import Trunc
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.template.loader import get_template
+from django.utils import timezone
 from django.utils.encoding import force_str
 from django.utils.text import capfirst
 from django.utils.translation import gettext_lazy
@@ -22,9 +28,12 @@ from django.urls import reverse, reverse_lazy
 from django.views import generic
 
 from . import permissions, utils
+from . import settings as admin2_settings
 from .filters import build_list_filter, build_date_filter
 from .forms import AdminAuthenticationForm
 from .models import LogEntry
+from .pagination import (CountingPaginator, InvalidCursor, KeysetPaginator,
+                         get_count_strategy)
 from .viewmixins import Admin2Mixin, Admin2ModelMixin, Admin2ModelFormMixin
 
 
@@ -54,17 +63,27 @@ class IndexView(Admin2Mixin, generic.TemplateView):
                         each item has a key being the `app_label` and
                         the value being a string, (or even a lazy
                         translation object), with the custom app name.
+    :permission_matrix: The permissions of the user for the views named in
+                        `permission_names` of every model admin, see
+                        djadmin2.permissions.get_permission_matrix.
     """
     default_template_name = "index.html"
     registry = None
     apps = None
     app_verbose_names = None
+    # The views whose permissions the model list shows
+    permission_names = ('view', 'add', 'change')
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
         data.update({
             'apps': self.apps,
             'app_verbose_names': self.app_verbose_names,
+            'permission_matrix': permissions.get_permission_matrix(
+                self.request,
+                chain.from_iterable(
+                    registry.values() for registry in self.apps.values()),
+                self.permission_names),
         })
         return data
 
@@ -81,11 +100,14 @@ class AppIndexView(Admin2Mixin, generic.TemplateView):
                         `app_label` and the value being a string, (or
                         even a lazy translation object), with the custom
                         app name.
+    :permission_matrix: The permissions of the user for the views named in
+                        `permission_names` of the model admins of the app.
     """
     default_template_name = "app_index.html"
     registry = None
     apps = None
     app_verbose_names = None
+    permission_names = ('view', 'add', 'change')
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
@@ -95,6 +117,8 @@ class AppIndexView(Admin2Mixin, generic.TemplateView):
             'app_label': app_label,
             'registry': registry,
             'app_verbose_names': self.app_verbose_names,
+            'permission_matrix': permissions.get_permission_matrix(
+                self.request, registry.values(), self.permission_names),
         })
         return data
 
@@ -113,19 +137,131 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
                         app name.
     """
     default_template_name = "model_list.html"
+    rows_template_name = "includes/list_rows.html"
     paginate_by = 10
+    cursor_kwarg = 'cursor'
+    show_all_kwarg = 'all'
+    stream_chunk_size = 100
     permission_classes = (
         permissions.IsStaffPermission,
         permissions.ModelViewPermission)
 
+    def get(self, request, *args, **kwargs):
+        if self.is_show_all():
+            return self.stream_list()
+        return super().get(request, *args, **kwargs)
+
+    def is_show_all(self):
+        if not self.model_admin.list_max_show_all:
+            return False
+        return bool(self.request.GET.get(self.show_all_kwarg))
+
+    def get_paginate_by(self, queryset):
+        if self.is_show_all():
+            return None
+        return super().get_paginate_by(queryset)
+
+    def get_rows_template(self):
+        return get_template(os.path.join(
+            admin2_settings.ADMIN2_THEME_DIRECTORY, self.rows_template_name))
+
+    def stream_list(self):
+        """
+        Streams the list page with up to ``list_max_show_all`` rows, which
+        are rendered while they are read from the database.
+        """
+        self.object_list = self.get_queryset()
+        marker = 'djadmin2-rows-%s' % uuid.uuid4().hex
+        context = self.get_context_data(rows_marker=marker)
+        rows = self.iter_rows(context)
+        response = self.render_to_response(context)
+        head, tail = response.rendered_content.split(marker)
+        return StreamingHttpResponse(
+            chain([head], rows, [tail]), content_type=response['Content-Type'])
+
+    def get_rows_queryset(self):
+        """
+        Returns the keyset paginator of the rows and their queryset after
+        the ``cursor`` parameter, with one row more than
+        ``list_max_show_all`` to tell if there are more. An ordering by an
+        expression or at random has no cursor, the paginator is then None
+        and only the first rows are shown.
+        """
+        limit = self.model_admin.list_max_show_all
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        try:
+            paginator = KeysetPaginator(self.get_queryset(), limit)
+        except ImproperlyConfigured:
+            if cursor:
+                raise Http404('This list has no cursor.')
+            return None, self.get_queryset()[:limit]
+        try:
+            direction, values = paginator.parse_cursor(cursor)
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return paginator, paginator.get_queryset(direction, values)[:limit + 1]
+
+    def get_more_rows_urls(self, paginator, last):
+        """
+        Returns the URLs of the list page and of the rows after the object.
+        """
+        params = self.request.GET.copy()
+        params[self.cursor_kwarg] = paginator.get_next_cursor(last)
+        params[self.show_all_kwarg] = '1'
+        return {
+            'next_page_url': '%s?%s' % (
+                reverse(utils.admin2_urlname(self, 'index')), params.urlencode()),
+            'next_rows_url': '%s?%s' % (
+                reverse(utils.admin2_urlname(self, 'rows')), params.urlencode()),
+        }
+
+    def iter_rows(self, context):
+        """
+        Returns an iterator over the rendered rows of the list after the
+        ``cursor`` parameter, at most ``list_max_show_all`` of them and
+        ``stream_chunk_size`` rows at a time. If there are more rows, a last
+        row links to them. The rows are rendered with the given context.
+        """
+        limit = self.model_admin.list_max_show_all
+        paginator, queryset = self.get_rows_queryset()
+        template = self.get_rows_template()
+
+        def render(**kwargs):
+            return template.render(dict(context, **kwargs), self.request)
+
+        def iterator():
+            objects = queryset.iterator(chunk_size=self.stream_chunk_size)
+            count = 0
+            last = None
+            while count < limit:
+                chunk = list(islice(
+                    objects, min(self.stream_chunk_size, limit - count)))
+                if not chunk:
+                    break
+                if queryset._prefetch_related_lookups:
+                    prefetch_related_objects(
+                        chunk, *queryset._prefetch_related_lookups)
+                count += len(chunk)
+                last = chunk[-1]
+                yield render(object_list=chunk)
+            if paginator is not None and next(objects, None) is not None:
+                yield render(
+                    object_list=[], **self.get_more_rows_urls(paginator, last))
+
+        return iterator()
+
     def post(self, request):
         action_name = request.POST['action']
         action_callable = self.get_actions()[action_name]['action_callable']
         selected_model_pks = request.POST.getlist('selected_model_pk')
         if getattr(action_callable, "only_selected", True):
-            queryset = self.model.objects.filter(pk__in=selected_model_pks)
+            queryset = self.filter_permitted_queryset(
+                self.model.objects.filter(pk__in=selected_model_pks))
+        elif getattr(action_callable, "filtered_queryset", False):
+            # All items of the list, as searched and filtered
+            queryset = self.get_queryset()
         else:
-            queryset = self.model.objects.all()
+            queryset = self.filter_permitted_queryset(self.model.objects.all())
 
         #  If action_callable is a class subclassing from
         #  actions.BaseListAction then we generate the callable object.
@@ -141,43 +277,26 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
             return response
 
     def get_search_results(self, queryset, search_term):
-        # Lifted from django.contrib.admin
-        def construct_search(field_name):
-            if field_name.startswith('^'):
-                return "%s__istartswith" % field_name[1:]
-            elif field_name.startswith('='):
-                return "%s__iexact" % field_name[1:]
-            elif field_name.startswith('@'):
-                return "%s__search" % field_name[1:]
-            else:
-                return "%s__icontains" % field_name
-
-        use_distinct = False
-
-        orm_lookups = [construct_search(str(search_field))
-                       for search_field in self.model_admin.search_fields]
-
-        for bit in search_term.split():
-            or_queries = [models.Q(**{orm_lookup: bit})
-                          for orm_lookup in orm_lookups]
-            queryset = queryset.filter(reduce(operator.or_, or_queries))
-
-        if not use_distinct:
-            for search_spec in orm_lookups:
-                opts = utils.model_options(self.get_model())
-                if utils.lookup_needs_distinct(opts, search_spec):
-                    use_distinct = True
-                    break
-
-        return queryset, use_distinct
+        backend = self.model_admin.get_search_backend()
+        return backend.get_search_results(queryset, search_term)
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # The list queryset is built once per request, the pagination, the
+        # filters and the date drilldown all share it
+        if not hasattr(self, '_queryset'):
+            self._queryset = self.build_queryset()
+        if isinstance(self._queryset, models.QuerySet):
+            return self._queryset.all()
+        return self._queryset
+
+    def build_queryset(self):
+        queryset = self.filter_permitted_queryset(super().get_queryset())
         search_term = self.request.GET.get('q', None)
         search_use_distinct = False
         if self.model_admin.search_fields and search_term:
             queryset, search_use_distinct = self.get_search_results(
                 queryset, search_term)
+        self.search_use_distinct = search_use_distinct
 
         queryset = self._modify_queryset_for_ordering(queryset)
 
@@ -187,6 +306,8 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
         if self.model_admin.date_hierarchy:
             queryset = self.build_date_filter(queryset, self.model_admin.date_hierarchy).qs
 
+        queryset = self._modify_queryset_for_related(queryset)
+        queryset = self._modify_queryset_for_columns(queryset)
         queryset = self._modify_queryset_for_sort(queryset)
 
         if search_use_distinct:
@@ -194,33 +315,165 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
         else:
             return queryset
 
+    def get_ordering(self):
+        if not hasattr(self, '_ordering'):
+            self._ordering = self.model_admin.get_ordering(self.request)
+        return self._ordering
+
     def _modify_queryset_for_ordering(self, queryset):
-        ordering = self.model_admin.get_ordering(self.request)
+        ordering = self.get_ordering()
         if ordering:
             queryset = queryset.order_by(*ordering)
         return queryset
 
+    def get_sort_columns(self):
+        """
+        Returns the ordering of every column of ``list_display`` that the
+        list can be sorted by, by column name.
+        """
+        columns = {}
+        for name in self.model_admin.list_display:
+            if name == '__str__':
+                ordering = self.model_admin.str_ordering or self.get_ordering()
+                ordering = ordering or utils.model_options(self.model).ordering
+                columns[name] = [field for field in ordering or ['pk']
+                                 if isinstance(field, str)]
+            elif isinstance(name, str):
+                if utils.get_lookup_path_info(self.model, name).sortable:
+                    columns[name] = [name]
+        return columns
+
+    def get_sort_keys(self):
+        """
+        Returns the ``(column, descending)`` pairs of the ``sort`` parameter,
+        a comma separated list of columns each with an optional ``-`` for a
+        descending sort. Unknown and repeated columns are ignored.
+        """
+        if not hasattr(self, '_sort_keys'):
+            columns = self.get_sort_columns()
+            keys = []
+            for key in self.request.GET.get('sort', '').split(','):
+                key = key.strip()
+                name = key.lstrip('-')
+                if name in columns and name not in dict(keys):
+                    keys.append((name, key.startswith('-')))
+            self._sort_keys = keys
+        return self._sort_keys
+
+    def get_sort_ordering(self):
+        """
+        Returns the ``order_by()`` arguments of the sort keys.
+        """
+        columns = self.get_sort_columns()
+        ordering = []
+        for name, descending in self.get_sort_keys():
+            for field in columns[name]:
+                if descending:
+                    field = field[1:] if field.startswith('-') else '-' + field
+                ordering.append(field)
+        return ordering
+
+    def get_sort_url(self, keys):
+        sort = ','.join(
+            '-' + name if descending else name for name, descending in keys)
+        return './?sort=%s' % sort if sort else './'
+
+    def get_sort_headers(self):
+        """
+        Returns the sort state and links of the columns of ``list_display``.
+        A column's ``url`` makes it the first sort key, or reverses it if it
+        is the first one already, and keeps the other keys after it. Its
+        ``remove_url`` sorts by the other keys only.
+        """
+        columns = self.get_sort_columns()
+        keys = self.get_sort_keys()
+        sorted_by = dict(keys)
+        headers = []
+        for name in self.model_admin.list_display:
+            header = {'name': name, 'sortable': name in columns}
+            if name in sorted_by:
+                others = [key for key in keys if key[0] != name]
+                descending = sorted_by[name]
+                header.update({
+                    'priority': keys.index((name, descending)) + 1,
+                    'descending': descending,
+                    'remove_url': self.get_sort_url(others),
+                })
+                if header['priority'] == 1:
+                    descending = not descending
+                header['url'] = self.get_sort_url([(name, descending)] + others)
+            elif header['sortable']:
+                header['url'] = self.get_sort_url([(name, False)] + keys)
+            headers.append(header)
+        return headers
+
     def _modify_queryset_for_sort(self, queryset):
-        # If we are sorting AND the field exists on the model
-        sort_by = self.request.GET.get('sort', None)
-        if sort_by:
-            # Special case when we are not explicityly displaying fields
-            if sort_by == '-__str__':
-                queryset = queryset[::-1]
-            try:
-                # If we sort on '-' remove it before looking for that field
-                field_exists = sort_by
-                if field_exists[0] == '-':
-                    field_exists = field_exists[1:]
-
-                options = utils.model_options(self.model)
-                options.get_field(field_exists)
-                queryset = queryset.order_by(sort_by)
-            except FieldDoesNotExist:
-                # If the field does not exist then we dont sort on it
-                pass
+        ordering = self.get_sort_ordering()
+        if ordering:
+            queryset = queryset.order_by(*ordering)
         return queryset
 
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        return CountingPaginator(
+            queryset, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            count_strategy=self.get_count_strategy(), **kwargs)
+
+    def get_count_strategy(self):
+        return get_count_strategy(
+            self.model_admin.list_count, self.model_admin.list_count_cap)
+
+    def get_list_select_related(self):
+        select_related = self.model_admin.list_select_related
+        if select_related is False:
+            # Find the relations that the list columns need ourselves
+            select_related = utils.get_list_select_related(
+                self.model, self.model_admin.list_display)
+        return select_related
+
+    def _modify_queryset_for_related(self, queryset):
+        select_related = self.get_list_select_related()
+        if select_related is True:
+            queryset = queryset.select_related()
+        elif select_related:
+            queryset = queryset.select_related(*select_related)
+
+        prefetch_related = self.model_admin.list_prefetch_related
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def _modify_queryset_for_columns(self, queryset):
+        select_related = self.get_list_select_related()
+        only = None
+        if select_related is not True:
+            only = utils.get_list_only_fields(
+                self.model,
+                [*self.model_admin.list_display,
+                 *self.model_admin.list_display_links],
+                str_fields=self.model_admin.list_str_fields,
+                ordering=self.get_ordering() or (),
+                select_related=select_related)
+        if only is not None:
+            queryset = queryset.only(*only)
+        if self.model_admin.list_defer:
+            queryset = queryset.defer(*self.model_admin.list_defer)
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.model_admin.pagination != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+        if not isinstance(queryset, models.QuerySet):
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
     def build_list_filter(self, queryset=None):
         if not hasattr(self, '_list_filter'):
             if queryset is None:
@@ -253,8 +506,11 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
         context['search_term'] = self.request.GET.get('q', '')
         context['list_filter'] = self.build_list_filter()
         context['sort_term'] = self.request.GET.get('sort', '')
+        context['sort_keys'] = self.get_sort_keys()
+        context['sort_headers'] = self.get_sort_headers()
 
         if self.model_admin.date_hierarchy:
+            queryset = self.get_date_hierarchy_queryset()
             year = self.request.GET.get("year", False)
             month = self.request.GET.get("month", False)
             day = self.request.GET.get("day", False)
@@ -271,35 +527,41 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
 
                 context["active_day"] = new_date.strftime("%B %d")
 
-                context["dates"] = self._format_days(self.get_queryset())
+                context["dates"] = self._format_days(queryset)
             elif year and month:
                 context["previous_date"] = {
                     "link": "?year=%s" % (year),
                     "text": "‹ %s" % year,
                 }
 
-                context["dates"] = self._format_days(self.get_queryset())
+                context["dates"] = self._format_days(queryset)
             elif year:
                 context["previous_date"] = {
                     "link": "?",
                     "text": gettext_lazy("‹ All dates"),
                 }
 
-                context["dates"] = self._format_months(self.get_queryset())
+                context["dates"] = self._format_months(queryset)
             else:
-                context["dates"] = self._format_years(self.get_queryset())
+                context["dates"] = self._format_years(queryset)
 
         return context
 
+    def get_date_hierarchy_queryset(self):
+        # The list is already searched and filtered, also by the selected
+        # dates, so the drilldown doesn't have to build it again
+        if isinstance(self.object_list, models.QuerySet):
+            return self.object_list
+        return self.get_queryset()
+
     def _format_years(self, queryset):
-        years = self._qs_date_or_datetime(queryset, 'year')
+        years = self._date_buckets(queryset, 'year')
         if len(years) == 1:
             return self._format_months(queryset)
         else:
             return [
-                (("?year=%s" % year.strftime("%Y")), year.strftime("%Y"))
-                for year in
-                self._qs_date_or_datetime(queryset, 'year')
+                (("?year=%s" % year.strftime("%Y")), year.strftime("%Y"), count)
+                for year, count in years
             ]
 
     def _format_months(self, queryset):
@@ -308,9 +570,10 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
                 "?year=%s&month=%s" % (
                     date.strftime("%Y"), date.strftime("%m")
                 ),
-                date.strftime("%B %Y")
-            ) for date in
-            self._qs_date_or_datetime(queryset, 'month')
+                date.strftime("%B %Y"),
+                count,
+            ) for date, count in
+            self._date_buckets(queryset, 'month')
         ]
 
     def _format_days(self, queryset):
@@ -321,11 +584,57 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
                     date.strftime("%m"),
                     date.strftime("%d"),
                 ),
-                date.strftime("%B %d")
-            ) for date in
-            self._qs_date_or_datetime(queryset, 'day')
+                date.strftime("%B %d"),
+                count,
+            ) for date, count in
+            self._date_buckets(queryset, 'day')
         ]
 
+    def _date_buckets(self, queryset, kind):
+        """
+        Returns the distinct dates of the given kind as ``(date, count)``
+        pairs. The count is None unless ``date_hierarchy_counts`` is set.
+        """
+        if not self.model_admin.date_hierarchy_counts:
+            return [
+                (date, None)
+                for date in self._qs_date_or_datetime(queryset, kind)]
+
+        timeout = self.model_admin.date_hierarchy_cache_timeout
+        if timeout:
+            cache = caches[admin2_settings.ADMIN2_CACHE]
+            try:
+                sql, params = queryset.query.sql_with_params()
+            except EmptyResultSet:
+                # The queryset can't have any rows
+                return []
+            key = utils.get_cache_key(
+                'date_buckets', sql, params, kind,
+                timezone.get_current_timezone_name())
+            buckets = cache.get(key)
+            if buckets is not None:
+                return buckets
+
+        buckets = self._qs_date_buckets(queryset, kind)
+        if timeout:
+            cache.set(key, buckets, timeout)
+        return buckets
+
+    def _qs_date_buckets(self, queryset, kind):
+        # One GROUP BY query for the dates and their counts
+        field_name = self.model_admin.date_hierarchy
+        if isinstance(self.model._meta.get_field(field_name), models.DateTimeField):
+            output_field = models.DateTimeField()
+        else:
+            output_field = models.DateField()
+        return list(
+            queryset.order_by()
+            .filter(**{'%s__isnull' % field_name: False})
+            .annotate(_djadmin2_date=Trunc(field_name, kind, output_field=output_field))
+            .values_list('_djadmin2_date')
+            .annotate(count=models.Count('pk', distinct=True))
+            .order_by('_djadmin2_date'))
+
     def _qs_date_or_datetime(self, object_list, type):
         if isinstance(self.model._meta.get_field(self.model_admin.date_hierarchy), models.DateTimeField):
             qs = object_list.datetimes(self.model_admin.date_hierarchy, type)
@@ -345,6 +654,23 @@ class ModelListView(Admin2ModelMixin, generic.ListView):
         return self.model_admin.search_fields
 
 
+class ModelListRowsView(ModelListView):
+    """
+    The rows of the list after the ``cursor`` parameter as an HTML fragment,
+    for loading more rows into a list that shows all rows.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not self.model_admin.list_max_show_all:
+            raise Http404
+        context = {
+            'view': self,
+            'permissions': permissions.TemplatePermissionChecker(
+                request, self.model_admin),
+        }
+        return StreamingHttpResponse(self.iter_rows(context))
+
+
 class ModelDetailView(Admin2ModelMixin, generic.DetailView):
     """Context Variables
 
@@ -505,7 +831,12 @@ class ModelHistoryView(Admin2ModelMixin, generic.ListView):
         return context
 
     def get_object(self):
-        return get_object_or_404(self.get_model(), pk=self.kwargs.get('pk'))
+        if not hasattr(self, 'object'):
+            self.object = get_object_or_404(
+                self.filter_permitted_queryset(
+                    self.get_model()._default_manager.all()),
+                pk=self.kwargs.get('pk'))
+        return self.object
 
     def get_queryset(self):
         content_type = ContentType.objects.get_for_model(self.get_object())
@@ -2,7 +2,9 @@
 from django.utils.translation import gettext_lazy
 
 from djadmin2 import renderers
-from djadmin2.actions import DeleteSelectedAction
+from djadmin2.actions import (CSVExportAction, DeleteSelectedAction,
+                              JSONLinesExportAction, XLSXExportAction)
+from djadmin2.filters import CachedModelChoiceFilter
 
 # Import your custom models
 from djadmin2.site import djadmin2_site
@@ -20,7 +22,8 @@ class PostAdmin(ModelAdmin2):
     list_actions = [
         DeleteSelectedAction, CustomPublishAction,
         PublishAllItemsAction, unpublish_items,
-        unpublish_all_items,
+        unpublish_all_items, CSVExportAction, JSONLinesExportAction,
+        XLSXExportAction,
     ]
     inlines = [CommentInline]
     search_fields = ('title', '^body')
@@ -35,7 +38,11 @@ class PostAdmin(ModelAdmin2):
 
 class CommentAdmin(ModelAdmin2):
     search_fields = ('body', '=post__title')
-    list_filter = ['post', ]
+    list_filter = [
+        CachedModelChoiceFilter(
+            field_name='post', mode='frequency', limit=20, cache_timeout=60,
+            search_fields=('title',)),
+    ]
     actions_on_top = True
     actions_on_bottom = True
     actions_selection_counter = False
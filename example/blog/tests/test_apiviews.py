@@ -1,6 +1,7 @@
 import json
 
 from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.test import TestCase
 from django.test.client import RequestFactory
@@ -117,3 +118,55 @@ class RetrieveUpdateDestroyAPIViewTest(APITestCase):
         view = apiviews.RetrieveUpdateDestroyAPIView.as_view(
             **model_admin.get_api_detail_kwargs())
         self.assertRaises(PermissionDenied, view, request, pk=post.pk)
+
+
+class AutocompleteAPIViewTest(TestCase):
+
+    def setUp(self):
+        self.rf = RequestFactory()
+        self.user = User(username='admin', is_staff=True, is_superuser=True)
+        self.user.save()
+        for title in ('first post', 'second post', 'First draft', 'other'):
+            Post.objects.create(title=title, body='body')
+
+        class PostAdmin(ModelAdmin2):
+            search_fields = ['^title', 'body']
+            autocomplete_limit = 2
+            autocomplete_cache_timeout = 0
+            ordering = ['title']
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+
+    def get(self, **params):
+        request = self.rf.get(reverse('admin2:blog_post_api_autocomplete'), params)
+        request.user = self.user
+        view = apiviews.AutocompleteAPIView.as_view(
+            **self.model_admin.get_api_autocomplete_kwargs())
+        response = view(request)
+        response.render()
+        return json.loads(response.content)
+
+    def test_prefix(self):
+        results = self.get(q='fir')
+        self.assertEqual(
+            [result['label'] for result in results],
+            ['First draft', 'first post'])
+        post = Post.objects.get(title='First draft')
+        self.assertEqual(results[0]['pk'], post.pk)
+        self.assertEqual(
+            results[0]['url'],
+            reverse('admin2:blog_post_detail', kwargs={'pk': post.pk}))
+
+    def test_limit(self):
+        self.model_admin.autocomplete_search_fields = ['title']
+        self.assertEqual(len(self.get(q='f')), 2)
+        self.assertEqual(self.get(q='post'), [])
+        self.assertEqual(self.get(q=''), [])
+
+    def test_cache(self):
+        self.model_admin.autocomplete_cache_timeout = 30
+        cache.clear()
+        self.assertEqual(len(self.get(q='other')), 1)
+        Post.objects.filter(title='other').delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.get(q='other')), 1)
@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from djadmin2 import permissions, views
+from djadmin2.management.commands.admin2_index_report import (
+    Command, get_index_needs)
+from djadmin2.site import djadmin2_site
+from djadmin2.types import ModelAdmin2
+from ..models import Comment, Post
+
+
+class StaffPostsPermission(permissions.BasePermission):
+    def filter_queryset(self, request, view, queryset):
+        if not request.user.is_staff:
+            return queryset.none()
+        return queryset
+
+
+class IndexReportTest(TestCase):
+
+    def report(self, *args):
+        out = StringIO()
+        call_command('admin2_index_report', *args, stdout=out)
+        return out.getvalue()
+
+    def test_index_needs(self):
+        class CommentAdmin(ModelAdmin2):
+            list_display = ('body', 'post', 'post__title')
+            list_filter = ['post__published']
+            ordering = ['-body', 'post__title', 'id']
+
+        needs = get_index_needs(CommentAdmin(Comment, djadmin2_site))
+        self.assertEqual(
+            [(need.reason, need.model, need.fields) for need in needs],
+            [('ordering', Comment, ['-body']),
+             ('list_filter', Post, ['published']),
+             ('sort by body', Comment, ['body']),
+             ('sort by post', Comment, ['post']),
+             ('sort by post__title', Post, ['title'])])
+        # The foreign key has an index, the body doesn't
+        self.assertEqual(needs[3].columns, ['post_id'])
+
+    def test_report(self):
+        output = self.report('blog')
+        self.assertIn('blog.Post (PostAdmin)', output)
+        self.assertIn('Sorted by title:', output)
+        self.assertIn('ORDER BY "blog_post"."title"', output)
+        self.assertIn('! sort by title: blog_post (title)', output)
+        self.assertIn(
+            "models.Index(fields=['-published_date', 'title'], ", output)
+        # Covered by the composite index of the ordering
+        self.assertNotIn("models.Index(fields=['published_date']", output)
+        self.assertNotIn('sort by post', output)
+        self.assertNotIn('auth.', output)
+        if connection.vendor == 'sqlite':
+            self.assertIn('! sorts without an index', output)
+
+    def test_no_explain(self):
+        output = self.report('blog', '--no-explain')
+        self.assertIn('Sorted by title:', output)
+        self.assertNotIn('! sorts without an index', output)
+
+    def test_queries_have_a_user(self):
+        class ListView(views.ModelListView):
+            permission_classes = views.ModelListView.permission_classes + (
+                StaffPostsPermission,)
+
+        class PostAdmin(ModelAdmin2):
+            index_view = views.AdminView(r"^$", ListView, name="index")
+
+        model_admin = PostAdmin(Post, djadmin2_site)
+        command = Command()
+        user = get_user_model().objects.create(username='admin', is_staff=True)
+        # An anonymous user by default
+        for title, queryset in command.get_queries(model_admin, connection):
+            self.assertTrue(queryset.query.is_empty())
+        for title, queryset in command.get_queries(model_admin, connection, user):
+            self.assertFalse(queryset.query.is_empty())
+
+    def test_unknown_user(self):
+        with self.assertRaises(CommandError):
+            self.report('blog', '--username', 'nobody')
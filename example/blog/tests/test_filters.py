@@ -1,11 +1,18 @@
+import json
+
 import django_filters
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
 from django.test.client import RequestFactory
 from django.urls import reverse
 
+from djadmin2 import apiviews
 from djadmin2 import filters as djadmin2_filters
+from djadmin2.site import djadmin2_site
 from djadmin2.types import ModelAdmin2
-from ..models import Post
+from ..models import Comment, Post
 
 
 class ListFilterBuilderTest(TestCase):
@@ -52,3 +59,133 @@ class ListFilterBuilderTest(TestCase):
             Post.objects.all(),
         )
         self.assertTrue(isinstance(list_filter_inst, FS))
+
+    def test_filterset_class_is_cached(self):
+        class PostAdmin(ModelAdmin2):
+            list_filter = ['published']
+
+        Post.objects.create(title="post_1_title", body="body")
+        first = djadmin2_filters.build_list_filter(
+            self.rf.get('/', {'published': '2'}), PostAdmin, Post.objects.all())
+        second = djadmin2_filters.build_list_filter(
+            self.rf.get('/', {'published': '3'}), PostAdmin, Post.objects.all())
+        self.assertIs(first.__class__, second.__class__)
+        self.assertIsNot(first.filters, second.filters)
+        self.assertEqual(second.qs.count(), 1)
+        self.assertEqual(first.qs.count(), 0)
+
+        date_filter = djadmin2_filters.build_date_filter(
+            self.rf.get('/'), PostAdmin, Post.objects.all())
+        self.assertIs(
+            date_filter.__class__,
+            djadmin2_filters.get_date_filter_class(Post, 'published_date'))
+
+
+class CachedModelChoiceFilterTest(TestCase):
+
+    def setUp(self):
+        self.rf = RequestFactory()
+        cache.clear()
+        for title, comments in (('rare', 1), ('popular', 3), ('none', 0)):
+            post = Post.objects.create(title=title, body='body')
+            for index in range(comments):
+                Comment.objects.create(post=post, body='comment')
+
+    def get_filterset(self, **kwargs):
+        class CommentAdmin(ModelAdmin2):
+            list_filter = [
+                djadmin2_filters.CachedModelChoiceFilter(
+                    field_name='post', **kwargs),
+            ]
+
+        return djadmin2_filters.build_list_filter(
+            self.rf.get('/'), CommentAdmin, Comment.objects.all())
+
+    def get_choices(self, filterset):
+        return list(filterset.form.fields['post'].widget.choices)[1:]
+
+    def test_all(self):
+        filterset = self.get_filterset(limit=2)
+        with self.assertNumQueries(1):
+            choices = self.get_choices(filterset)
+        self.assertEqual(
+            [label for value, label in choices], ['rare', 'popular'])
+
+    def test_frequency(self):
+        filterset = self.get_filterset(mode='frequency', limit=5)
+        with self.assertNumQueries(2):
+            choices = self.get_choices(filterset)
+        popular = Post.objects.get(title='popular')
+        self.assertEqual(choices[0], (popular.pk, 'popular (3)'))
+        self.assertEqual(
+            [label for value, label in choices], ['popular (3)', 'rare (1)'])
+        self.assertEqual(filterset.qs.count(), 4)
+
+    def test_cache(self):
+        self.get_choices(self.get_filterset(cache_timeout=60))
+        filterset = self.get_filterset(cache_timeout=60)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.get_choices(filterset)), 3)
+
+    def test_render_and_filter(self):
+        popular = Post.objects.get(title='popular')
+
+        class CommentAdmin(ModelAdmin2):
+            list_filter = [
+                djadmin2_filters.CachedModelChoiceFilter(
+                    field_name='post', search_fields=['title']),
+            ]
+
+        filterset = djadmin2_filters.build_list_filter(
+            self.rf.get('/', {'post': popular.pk}), CommentAdmin,
+            Comment.objects.all())
+        self.assertEqual(filterset.qs.count(), 3)
+        output = str(filterset.form['post'])
+        self.assertIn('<a href=?post=%d ' % popular.pk, output)
+        self.assertIn('>popular</a>', output)
+        self.assertIn('filter-typeahead', output)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            djadmin2_filters.CachedModelChoiceFilter(
+                field_name='post', mode='random')
+
+
+class FilterChoicesAPIViewTest(TestCase):
+
+    def setUp(self):
+        self.rf = RequestFactory()
+        self.user = User(username='admin', is_staff=True, is_superuser=True)
+        self.user.save()
+        for title in ('first post', 'second post', 'other'):
+            Post.objects.create(title=title, body='body')
+
+        class CommentAdmin(ModelAdmin2):
+            list_filter = [
+                djadmin2_filters.CachedModelChoiceFilter(
+                    field_name='post', search_fields=['title']),
+                'body',
+            ]
+
+        self.model_admin = CommentAdmin(Comment, djadmin2_site)
+
+    def get(self, field_name, **params):
+        request = self.rf.get(
+            reverse('admin2:blog_comment_api_filter_choices',
+                    kwargs={'field_name': field_name}), params)
+        request.user = self.user
+        view = apiviews.FilterChoicesAPIView.as_view(
+            **self.model_admin.get_api_filter_choices_kwargs())
+        response = view(request, field_name=field_name)
+        response.render()
+        return response
+
+    def test_search(self):
+        response = self.get('post', q='post')
+        self.assertEqual(
+            [choice['label'] for choice in json.loads(response.content)],
+            ['first post', 'second post'])
+
+    def test_unknown_filter(self):
+        self.assertEqual(self.get('body').status_code, 404)
+        self.assertEqual(self.get('missing').status_code, 404)
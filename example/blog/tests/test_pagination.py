@@ -0,0 +1,193 @@
+from datetime import date
+
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase
+
+from djadmin2.pagination import (CappedCount, CountingPaginator,
+                                 EstimatedCount, ExactCount, InvalidCursor,
+                                 KeysetPaginator, encode_cursor,
+                                 get_count_strategy, get_keyset_ordering)
+from djadmin2.site import djadmin2_site
+from djadmin2.types import ModelAdmin2
+from ..models import Post
+from .utils import ListViewTestCase
+
+
+class KeysetPaginatorTest(TestCase):
+
+    def setUp(self):
+        published_dates = [
+            date(2013, 7, 22), None, date(2012, 5, 20), date(2012, 5, 20),
+            None, date(2012, 6, 20), date(2013, 7, 22),
+        ]
+        for index, published_date in enumerate(published_dates):
+            Post.objects.create(
+                title='post_%d' % (index % 3),
+                body='body',
+                published_date=published_date)
+
+    def get_expected(self, queryset):
+        # NULLs are always sorted last by the keyset paginator
+        expected = [post for post in queryset if post.published_date]
+        return expected + [post for post in queryset if not post.published_date]
+
+    def walk_forward(self, paginator):
+        page = paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_ordering_gets_pk_tiebreaker(self):
+        queryset = Post.objects.order_by('-published_date', 'title')
+        self.assertEqual(
+            get_keyset_ordering(queryset),
+            [('published_date', True), ('title', False), ('pk', False)])
+        self.assertEqual(
+            get_keyset_ordering(Post.objects.order_by('title', '-id', 'body')),
+            [('title', False), ('id', True)])
+
+    def test_walk_forward(self):
+        queryset = Post.objects.order_by('-published_date', 'title', 'pk')
+        paginator = KeysetPaginator(queryset, 2)
+        pages = self.walk_forward(paginator)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+        self.assertEqual(
+            [post.pk for page in pages for post in page],
+            [post.pk for post in self.get_expected(queryset)])
+
+    def test_walk_backward(self):
+        queryset = Post.objects.order_by('published_date', '-title')
+        paginator = KeysetPaginator(queryset, 3)
+        page = self.walk_forward(paginator)[-1]
+        pages = [page]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            pages.insert(0, page)
+        self.assertEqual(
+            [post.pk for page in pages for post in page],
+            [post.pk for post in self.get_expected(
+                queryset.order_by('published_date', '-title', 'pk'))])
+
+    def test_cursor_values_are_checked(self):
+        paginator = KeysetPaginator(Post.objects.order_by('pk'), 2)
+        with self.assertRaises(InvalidCursor):
+            paginator.page(encode_cursor('n', ['abc']))
+        paginator = KeysetPaginator(
+            Post.objects.order_by('published_date'), 2)
+        with self.assertRaises(InvalidCursor):
+            paginator.page(encode_cursor('n', ['yesterday', 1]))
+        post = Post.objects.get(published_date=date(2012, 6, 20))
+        # The values are converted, like a date and a pk as a string
+        page = paginator.page(encode_cursor('n', ['2012-06-20', str(post.pk)]))
+        self.assertEqual(
+            [post.published_date for post in page],
+            [date(2013, 7, 22), date(2013, 7, 22)])
+
+    def test_does_not_count(self):
+        paginator = KeysetPaginator(Post.objects.order_by('title'), 2)
+        page = paginator.page()
+        with self.assertNumQueries(1):
+            paginator.page(page.next_cursor)
+
+
+class KeysetListViewTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            Post.objects.create(title='post_%d' % index, body='body')
+
+        class KeysetPostAdmin(ModelAdmin2):
+            pagination = 'keyset'
+            list_per_page = 2
+            ordering = ['title']
+
+        self.model_admin = KeysetPostAdmin(Post, djadmin2_site)
+
+    def get(self, **params):
+        return self.get_list_response(self.model_admin, params)
+
+    def test_pages(self):
+        response = self.get()
+        page = response.context_data['page_obj']
+        self.assertEqual([post.title for post in page], ['post_0', 'post_1'])
+        self.assertTrue(response.context_data['is_paginated'])
+        response.render()
+        self.assertContains(response, '?cursor=%s' % page.next_cursor)
+
+        response = self.get(cursor=page.next_cursor)
+        page = response.context_data['page_obj']
+        self.assertEqual([post.title for post in page], ['post_2', 'post_3'])
+        self.assertTrue(page.has_previous())
+
+    def test_cursor_keeps_query(self):
+        response = self.get(q='post')
+        page = response.context_data['page_obj']
+        response.render()
+        self.assertContains(
+            response, '?q=post&amp;cursor=%s' % page.next_cursor)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(Http404):
+            self.get(cursor='invalid')
+        with self.assertRaises(Http404):
+            self.get(cursor=encode_cursor('n', ['post_1', 'abc']))
+
+
+class CountStrategyTest(TestCase):
+
+    def setUp(self):
+        for index in range(5):
+            Post.objects.create(title='post_%d' % index, body='body')
+
+    def test_exact(self):
+        count = ExactCount().count(Post.objects.all())
+        self.assertEqual(count, 5)
+        self.assertFalse(count.approximate)
+        self.assertEqual(count.display(), '5')
+
+    def test_capped(self):
+        count = CappedCount(cap=3).count(Post.objects.all())
+        self.assertEqual(count, 3)
+        self.assertTrue(count.capped)
+        self.assertEqual(count.display(), '3+')
+        self.assertFalse(CappedCount(cap=5).count(Post.objects.all()).capped)
+
+    def test_estimated_falls_back_to_capped(self):
+        count = EstimatedCount(cap=3).count(Post.objects.filter(body='body'))
+        self.assertTrue(count.capped)
+
+    def test_estimated_from_statistics(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Uses the SQLite statistics table')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE %s' % Post._meta.db_table)
+        Post.objects.create(title='post_5', body='body')
+        count = EstimatedCount(cap=3).count(Post.objects.all())
+        self.assertTrue(count.estimated)
+        self.assertEqual(count, 5)
+        self.assertEqual(count.display(), '~5')
+        # small estimates are replaced by an exact count
+        self.assertEqual(EstimatedCount(cap=10).count(Post.objects.all()), 6)
+
+    def test_get_count_strategy(self):
+        strategy = get_count_strategy('capped', 10)
+        self.assertIsInstance(strategy, CappedCount)
+        self.assertEqual(strategy.cap, 10)
+        self.assertIs(get_count_strategy(strategy), strategy)
+
+    def test_capped_paginator_pages_past_cap(self):
+        paginator = CountingPaginator(
+            Post.objects.order_by('pk'), 2, count_strategy=CappedCount(cap=3))
+        self.assertEqual(paginator.count_display(), '3+')
+        page = paginator.page(2)
+        self.assertTrue(page.has_next())
+        self.assertEqual(repr(page), '<Page 2 of 2+>')
+        page = paginator.page(3)
+        self.assertEqual(len(page), 1)
+        self.assertFalse(page.has_next())
@@ -1,12 +1,19 @@
 from blog.models import Post
+from django.contrib.auth.backends import BaseBackend, ModelBackend
 from django.contrib.auth.models import User, Permission
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.template import Template, Context
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.test.client import RequestFactory
 from django.urls import reverse
 
-from djadmin2.permissions import TemplatePermissionChecker
+from djadmin2 import apiviews, views
+from djadmin2.permissions import (BasePermission, PermissionView,
+                                  TemplatePermissionChecker,
+                                  get_permission_matrix)
 from djadmin2.site import djadmin2_site
 from djadmin2.types import ModelAdmin2
 
@@ -290,6 +297,261 @@ class TemplatePermissionTest(TestCase):
             context)
         self.assertEqual(result, 'TrueFalse')
 
+    def test_decisions_are_kept_for_the_request(self):
+        checks = []
+
+        class CountingPermission(BasePermission):
+            def has_permission(self, request, view, obj=None):
+                checks.append(view)
+                return True
+
+        class DetailView(views.ModelDetailView):
+            permission_classes = (CountingPermission,)
+
+        class PostAdmin(ModelAdmin2):
+            detail_view = views.AdminView(
+                r"^(?P<pk>[0-9]+)/$", DetailView, name="detail")
+
+        request = self.factory.get(reverse('admin2:blog_post_index'))
+        request.user = self.user
+        permissions = TemplatePermissionChecker(
+            request, PostAdmin(Post, djadmin2_site))
+        post = Post.objects.create(title='Hello', body='world')
+
+        result = self.render(
+            '{% load admin2_tags %}'
+            '{% for i in rows %}{{ permissions.has_view_permission }}'
+            '{{ permissions.has_view_permission|for_object:post }}{% endfor %}',
+            {'permissions': permissions, 'rows': range(3), 'post': post})
+        self.assertEqual(result, 'TrueTrue' * 3)
+        # Once without and once with the object, and no view instances
+        self.assertEqual(len(checks), 2)
+        self.assertIsInstance(checks[0], PermissionView)
+        self.assertEqual(checks[0].model, Post)
+
+        # A new user gets new decisions
+        request.user = get_object_or_404(User, pk=self.user.id)
+        self.render('{{ permissions.has_view_permission }}',
+                    {'permissions': permissions})
+        self.assertEqual(len(checks), 3)
+
+
+class CountingBackend(ModelBackend):
+    def has_perm(self, user_obj, perm, obj=None):
+        user_obj.checked_permissions.append(perm)
+        return super().has_perm(user_obj, perm, obj)
+
+    def get_all_permissions(self, user_obj, obj=None):
+        user_obj.checked_permissions.append('*')
+        return super().get_all_permissions(user_obj, obj)
+
+
+class ViewPostsBackend(BaseBackend):
+    # Grants in has_perm() only, like the backends of django-rules
+    def has_perm(self, user_obj, perm, obj=None):
+        user_obj.checked_permissions.append(perm)
+        return perm == 'blog.view_post'
+
+
+class AddOnWeekdaysPermission(BasePermission):
+    def has_permission(self, request, view, obj=None):
+        request.user.checked_permissions.append('weekday')
+        return False
+
+
+@override_settings(AUTHENTICATION_BACKENDS=[
+    '%s.CountingBackend' % __name__])
+class PermissionMatrixTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create(username='admin', is_staff=True)
+        self.user.user_permissions.add(Permission.objects.get(
+            content_type__app_label='blog',
+            content_type__model='post',
+            codename='add_post'))
+        self.user.checked_permissions = []
+
+    def get_request(self, url):
+        request = self.factory.get(url)
+        request.user = self.user
+        return request
+
+    def test_matrix(self):
+        request = self.get_request(reverse('admin2:dashboard'))
+        model_admins = list(djadmin2_site.registry.values())
+        matrix = get_permission_matrix(request, model_admins)
+        self.assertEqual(matrix['blog_post'], {
+            'view': False, 'add': True, 'change': False, 'delete': False})
+        self.assertEqual(
+            set(matrix), set(model_admin.name for model_admin in model_admins))
+        self.assertEqual(
+            get_permission_matrix(request, model_admins, ['add'])['blog_post'],
+            {'add': True})
+
+    def test_dashboard_checks_each_permission_once(self):
+        request = self.get_request(reverse('admin2:dashboard'))
+        view = views.IndexView.as_view(**djadmin2_site.get_index_kwargs())
+        response = view(request)
+        self.assertEqual(
+            response.context_data['permission_matrix']['blog_post'],
+            {'view': False, 'add': True, 'change': False})
+        response.render()
+        self.assertContains(response, reverse('admin2:blog_post_create'))
+        self.assertNotContains(
+            response, 'href="%s"' % reverse('admin2:blog_post_index'))
+
+        # All permissions are loaded once, none is checked by itself
+        self.assertEqual(self.user.checked_permissions, ['*'])
+
+    def test_custom_permission_classes(self):
+        class CreateView(views.ModelAddFormView):
+            permission_classes = views.ModelAddFormView.permission_classes + (
+                AddOnWeekdaysPermission,)
+
+        class PostAdmin(ModelAdmin2):
+            create_view = views.AdminView(
+                r"^create/$", CreateView, name="create")
+
+        request = self.get_request(reverse('admin2:dashboard'))
+        matrix = get_permission_matrix(
+            request, [PostAdmin(Post, djadmin2_site)], ['view', 'add'])
+        self.assertEqual(matrix['blog_post'], {'view': False, 'add': False})
+        # Only the view with the custom permission class is checked by itself
+        checked = self.user.checked_permissions
+        self.assertIn('weekday', checked)
+        self.assertNotIn('blog.view_post', checked)
+
+    @override_settings(AUTHENTICATION_BACKENDS=[
+        '%s.ViewPostsBackend' % __name__])
+    def test_has_perm_only_backend(self):
+        request = self.get_request(reverse('admin2:dashboard'))
+        view = views.IndexView.as_view(**djadmin2_site.get_index_kwargs())
+        response = view(request)
+        self.assertEqual(
+            response.context_data['permission_matrix']['blog_post'],
+            {'view': True, 'add': False, 'change': False})
+        response.render()
+        self.assertContains(
+            response, 'href="%s"' % reverse('admin2:blog_post_index'))
+        # Every permission is asked once
+        checked = self.user.checked_permissions
+        self.assertIn('blog.view_post', checked)
+        self.assertEqual(len(checked), len(set(checked)))
+
+    def test_superuser(self):
+        self.user.is_superuser = True
+        request = self.get_request(reverse('admin2:dashboard'))
+        matrix = get_permission_matrix(
+            request, [djadmin2_site.get_admin_by_name('blog_post')])
+        self.assertEqual(matrix['blog_post'], {
+            'view': True, 'add': True, 'change': True, 'delete': True})
+
+    def test_app_index(self):
+        request = self.get_request(
+            reverse('admin2:app_index', kwargs={'app_label': 'blog'}))
+        view = views.AppIndexView.as_view(
+            **djadmin2_site.get_app_index_kwargs())
+        response = view(request, app_label='blog')
+        self.assertEqual(
+            set(response.context_data['permission_matrix']),
+            set(model_admin.name
+                for model_admin in djadmin2_site.apps['blog'].values()))
+        response.render()
+        self.assertContains(response, reverse('admin2:blog_post_create'))
+
+
+class PublishedPostsPermission(BasePermission):
+    def filter_queryset(self, request, view, queryset):
+        return queryset.filter(published=True)
+
+
+class PermissionFilterTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create(
+            username='admin', is_staff=True, is_superuser=True)
+        self.published = Post.objects.create(
+            title='published', body='body', published=True)
+        self.draft = Post.objects.create(title='draft', body='body')
+
+        class PostAdmin(ModelAdmin2):
+            search_fields = ['^title']
+            autocomplete_cache_timeout = 30
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+
+    def get_view(self, view_class, **kwargs):
+        class PublishedPostsView(view_class):
+            permission_classes = view_class.permission_classes + (
+                PublishedPostsPermission,)
+
+        return PublishedPostsView.as_view(**kwargs)
+
+    def request(self, url, method='get', params=None):
+        request = getattr(self.factory, method)(url, params or {})
+        request.user = self.user
+        return request
+
+    def test_list(self):
+        view = self.get_view(
+            views.ModelListView, **self.model_admin.get_index_kwargs())
+        response = view(self.request(reverse('admin2:blog_post_index')))
+        self.assertEqual(
+            list(response.context_data['object_list']), [self.published])
+
+    def test_actions_get_permitted_rows(self):
+        view = self.get_view(
+            views.ModelListView, **self.model_admin.get_index_kwargs())
+        request = self.request(reverse('admin2:blog_post_index'), 'post', {
+            'action': 'DeleteSelectedAction',
+            'selected_model_pk': [self.published.pk, self.draft.pk],
+            'confirmed': 'yes'})
+        request._messages = CookieStorage(request)
+        view(request)
+        self.assertEqual(list(Post.objects.all()), [self.draft])
+
+    def test_history(self):
+        view = self.get_view(
+            views.ModelHistoryView, **self.model_admin.get_default_view_kwargs())
+        url = reverse('admin2:blog_post_history', kwargs={'pk': self.draft.pk})
+        with self.assertRaises(Http404):
+            view(self.request(url), pk=self.draft.pk)
+        url = reverse(
+            'admin2:blog_post_history', kwargs={'pk': self.published.pk})
+        response = view(self.request(url), pk=self.published.pk)
+        self.assertEqual(response.status_code, 200)
+
+    def test_api(self):
+        view = self.get_view(
+            apiviews.ListCreateAPIView,
+            **self.model_admin.get_api_list_kwargs())
+        response = view(self.request(reverse('admin2:blog_post_api_list')))
+        self.assertEqual(
+            [post['pk'] for post in response.data['results']],
+            [self.published.pk])
+
+        view = self.get_view(
+            apiviews.RetrieveUpdateDestroyAPIView,
+            **self.model_admin.get_api_detail_kwargs())
+        url = reverse('admin2:blog_post_api_detail', kwargs={'pk': self.draft.pk})
+        response = view(self.request(url), pk=self.draft.pk)
+        self.assertEqual(response.status_code, 404)
+
+    def test_autocomplete_cache_is_per_queryset(self):
+        cache.clear()
+        Post.objects.create(title='dry', body='body', published=True)
+        url = reverse('admin2:blog_post_api_autocomplete')
+        view = apiviews.AutocompleteAPIView.as_view(
+            **self.model_admin.get_api_autocomplete_kwargs())
+        self.assertEqual(len(view(self.request(url, params={'q': 'dr'})).data), 2)
+        view = self.get_view(
+            apiviews.AutocompleteAPIView,
+            **self.model_admin.get_api_autocomplete_kwargs())
+        self.assertEqual(
+            [result['label']
+             for result in view(self.request(url, params={'q': 'dr'})).data],
+            ['dry'])
+
 
 class ViewPermissionTest(TestCase):
     def test_view_permission_was_created(self):
@@ -0,0 +1,312 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from djadmin2 import search
+from djadmin2.site import djadmin2_site
+from djadmin2.types import ModelAdmin2
+from ..models import Comment, Post
+from .utils import ListViewTestCase
+
+
+class SearchBackendTest(ListViewTestCase):
+
+    def search(self, model_admin, term):
+        return list(self.get_list_queryset(model_admin, {'q': term}))
+
+    def test_default_backend(self):
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title', '^body')
+
+        model_admin = PostAdmin(Post, djadmin2_site)
+        self.assertIsInstance(
+            model_admin.get_search_backend(), search.LookupSearchBackend)
+        post = Post.objects.create(title='a title', body='some body')
+        Post.objects.create(title='other', body='body')
+        self.assertEqual(self.search(model_admin, 'title some'), [post])
+
+    def test_needs_distinct(self):
+        class UserAdmin(ModelAdmin2):
+            search_fields = ('username', 'groups__name')
+
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title', '^body')
+
+        class CommentPostAdmin(ModelAdmin2):
+            search_fields = ('title', 'comments__body')
+
+        user_admin = UserAdmin(get_user_model(), djadmin2_site)
+        self.assertTrue(user_admin.get_search_backend().needs_distinct())
+        post_admin = PostAdmin(Post, djadmin2_site)
+        self.assertFalse(post_admin.get_search_backend().needs_distinct())
+        post_admin = CommentPostAdmin(Post, djadmin2_site)
+        self.assertTrue(post_admin.get_search_backend().needs_distinct())
+
+    def test_custom_backend(self):
+        class TitleSearchBackend(search.BaseSearchBackend):
+            def search(self, queryset, search_term):
+                return queryset.filter(title=search_term), False
+
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title',)
+            search_backend = TitleSearchBackend
+
+        post = Post.objects.create(title='title', body='body')
+        Post.objects.create(title='title 2', body='body')
+        model_admin = PostAdmin(Post, djadmin2_site)
+        self.assertEqual(self.search(model_admin, 'title'), [post])
+
+    def test_unknown_search_mode(self):
+        class PostAdmin(ModelAdmin2):
+            search_mode = 'grep'
+
+        with self.assertRaises(ImproperlyConfigured):
+            PostAdmin(Post, djadmin2_site)
+
+    def test_postgres_needs_postgres(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('Runs on PostgreSQL')
+
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title',)
+            search_mode = 'postgres'
+
+        with self.assertRaises(ImproperlyConfigured):
+            self.search(PostAdmin(Post, djadmin2_site), 'title')
+
+
+class SearchDistinctModeTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(title='post', body='body')
+        for index in range(3):
+            Comment.objects.create(post=self.post, body='a comment')
+        Post.objects.create(title='other', body='body')
+
+    def get_queryset(self, distinct_mode):
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title', 'comments__body')
+            search_distinct_mode = distinct_mode
+
+        return self.get_list_queryset(
+            PostAdmin(Post, djadmin2_site), {'q': 'comment'})
+
+    def test_distinct(self):
+        queryset = self.get_queryset('distinct')
+        self.assertTrue(queryset.query.distinct)
+        self.assertEqual(list(queryset), [self.post])
+
+    def test_subquery(self):
+        queryset = self.get_queryset('subquery')
+        self.assertFalse(queryset.query.distinct)
+        self.assertIn(' IN (SELECT', str(queryset.query))
+        self.assertEqual(list(queryset), [self.post])
+
+    def test_exists(self):
+        queryset = self.get_queryset('exists')
+        self.assertFalse(queryset.query.distinct)
+        self.assertIn('EXISTS', str(queryset.query))
+        self.assertEqual(list(queryset), [self.post])
+
+    def test_local_fields_stay_in_the_query(self):
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title',)
+            search_distinct_mode = 'subquery'
+
+        backend = PostAdmin(Post, djadmin2_site).get_search_backend()
+        queryset, use_distinct = backend.get_search_results(
+            Post.objects.all(), 'post')
+        self.assertNotIn('SELECT', str(queryset.query)[6:])
+        self.assertEqual(list(queryset), [self.post])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.get_queryset('group by')
+
+
+class SearchTermTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post = Post.objects.create(title='a title', body='some body')
+        Post.objects.create(title='other', body='body')
+        cache.clear()
+
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title', 'body')
+            search_max_terms = 2
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+
+    def search(self, term):
+        return list(self.get_list_queryset(self.model_admin, {'q': term}))
+
+    def test_normalize(self):
+        backend = self.model_admin.get_search_backend()
+        self.assertEqual(
+            backend.normalize_search_term(' Title  title TITLE some'),
+            'Title some')
+        self.assertEqual(
+            backend.normalize_search_term('a b c d'), 'a b')
+
+    def test_stopwords(self):
+        self.model_admin.search_stopwords = ('the', 'of')
+        backend = self.model_admin.get_search_backend()
+        self.assertEqual(
+            backend.normalize_search_term('The body of'), 'body')
+        # a term of stopwords only doesn't search
+        self.assertEqual(len(self.search('the of')), 2)
+
+    def test_cached_pks(self):
+        self.model_admin.search_cache_timeout = 60
+        self.assertEqual(self.search('title'), [self.post])
+        other = Post.objects.create(title='another title', body='body')
+        # The same search within the timeout finds the same rows
+        self.assertEqual(self.search('title'), [self.post])
+        self.assertEqual(
+            sorted(post.pk for post in self.search('title title')),
+            [self.post.pk])
+        cache.clear()
+        self.assertEqual(
+            sorted(post.pk for post in self.search('title')),
+            [self.post.pk, other.pk])
+
+    def test_too_many_results_are_not_cached(self):
+        self.model_admin.search_cache_timeout = 60
+        self.model_admin.search_cache_max_results = 1
+        self.assertEqual(len(self.search('body')), 2)
+        Post.objects.create(title='third', body='body')
+        self.assertEqual(len(self.search('body')), 3)
+
+
+class SQLiteFTS5SearchBackendTest(TestCase):
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Needs SQLite')
+
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title', 'body')
+            search_mode = 'fts5'
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+        self.backend = self.model_admin.get_search_backend()
+        self.addCleanup(search._shadow_backends.pop, Post)
+
+    def search(self, term):
+        queryset, use_distinct = self.backend.search(
+            Post.objects.order_by('pk'), term)
+        self.assertFalse(use_distinct)
+        return list(queryset)
+
+    def test_search(self):
+        first = Post.objects.create(title='Searching posts', body='quickly')
+        second = Post.objects.create(title='Other', body='searching "quoted"')
+        self.assertEqual(self.search('search'), [first, second])
+        self.assertEqual(self.search('search quick'), [first])
+        self.assertEqual(self.search('"quoted'), [second])
+        self.assertEqual(self.search('missing'), [])
+
+    def test_signals_keep_table_in_sync(self):
+        post = Post.objects.create(title='before', body='body')
+        post.title = 'after'
+        post.save()
+        self.assertEqual(self.search('before'), [])
+        self.assertEqual(self.search('after'), [post])
+        post.delete()
+        self.assertEqual(self.search('after'), [])
+
+    def test_rebuild(self):
+        # The table is created and filled on first use
+        Post.objects.create(title='created', body='body')
+        Post.objects.bulk_create([Post(title='bulk', body='body')])
+        self.assertEqual(self.search('bulk'), [])
+        self.backend.rebuild()
+        self.assertEqual(len(self.search('bulk')), 1)
+
+    def test_related_fields_are_rejected(self):
+        class CommentAdmin(ModelAdmin2):
+            search_fields = ('body', 'post__title')
+            search_mode = 'fts5'
+
+        with self.assertRaises(ImproperlyConfigured):
+            CommentAdmin(Comment, djadmin2_site)
+
+
+class TrigramSearchBackendTest(TestCase):
+
+    def setUp(self):
+        class PostAdmin(ModelAdmin2):
+            search_fields = ('title', 'body')
+            search_mode = 'trigram'
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+        self.backend = self.model_admin.get_search_backend()
+        self.addCleanup(search._shadow_backends.pop, Post)
+
+    def search(self, term):
+        queryset, use_distinct = self.backend.search(
+            Post.objects.order_by('pk'), term)
+        self.assertFalse(use_distinct)
+        return list(queryset)
+
+    def test_get_trigrams(self):
+        self.assertEqual(search.get_trigrams('ABcd'), {'abc', 'bcd'})
+        self.assertEqual(search.get_trigrams('ab'), set())
+
+    def test_substring_search(self):
+        first = Post.objects.create(title='Order ABC-1234', body='body')
+        second = Post.objects.create(title='other', body='mail@example.com')
+        self.assertEqual(self.search('c-12'), [first])
+        self.assertEqual(self.search('EXAMPLE'), [second])
+        self.assertEqual(self.search('o'), [first, second])
+        self.assertEqual(self.search('1234 body'), [first])
+        # all trigrams are there, but not as a substring
+        self.assertEqual(self.search('abc-123 mail'), [])
+
+    def test_signals_keep_table_in_sync(self):
+        post = Post.objects.create(title='before', body='body')
+        post.title = 'after'
+        post.save()
+        self.assertEqual(self.search('before'), [])
+        self.assertEqual(self.search('fte'), [post])
+        post.delete()
+        self.assertEqual(self.search('fte'), [])
+
+    def test_index_sql(self):
+        statements = self.backend.get_index_sql(connection)
+        if connection.vendor == 'postgresql':
+            self.assertIn('gin_trgm_ops', statements[-1])
+        else:
+            self.assertIn('blog_post_trigram', statements[0])
+
+    def test_index_matches_search_sql(self):
+        queryset, use_distinct = self.backend.search(Post.objects.all(), 'word')
+        sql, params = queryset.query.sql_with_params()
+        for field in self.backend.fields:
+            self.assertIn(self.backend.get_lookup_sql(
+                connection, field, Post._meta.db_table), sql)
+        if connection.vendor == 'postgresql':
+            statements = self.backend.get_index_sql(connection)
+            self.assertIn('USING gin ((UPPER("title"::text)) gin_trgm_ops)',
+                          statements[1])
+
+    def test_management_command(self):
+        registry = djadmin2_site.registry
+        self.addCleanup(registry.__setitem__, Post, registry[Post])
+        registry[Post] = self.model_admin
+        out = StringIO()
+        call_command('admin2_trigram_indexes', stdout=out)
+        self.assertIn('blog_post_trigram', out.getvalue())
+        self.assertNotIn('blog_comment', out.getvalue())
+
+        Post.objects.bulk_create([Post(title='bulk', body='body')])
+        call_command('admin2_trigram_indexes', '--create', stdout=out)
+        self.assertIn('Created the trigram indexes of blog.Post', out.getvalue())
+        self.assertEqual(len(self.search('bulk')), 1)
@@ -1,12 +1,28 @@
+import csv
+import io
+import json
+import re
+import zipfile
 from datetime import datetime
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404, QueryDict
 from django.test import TestCase, Client
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.encoding import force_str
 
+from djadmin2 import exports, permissions, utils, views
+from djadmin2.actions import CSVExportAction
+from djadmin2.pagination import encode_cursor
+from djadmin2.site import djadmin2_site
+from djadmin2.types import ModelAdmin2
 from ..models import Post, Comment
+from .utils import ListViewTestCase
 
 
 class BaseIntegrationTest(TestCase):
@@ -67,6 +83,142 @@ class CommentListTest(BaseIntegrationTest):
         self.assertNotContains(response, "of 1 selected")
 
 
+class ListSelectRelatedTest(ListViewTestCase):
+    url_name = "admin2:blog_comment_index"
+
+    def get_list_queries(self, model_admin):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_list_response(model_admin).render()
+        return len(queries)
+
+    def create_comments(self, count):
+        for index in range(count):
+            post = Post.objects.create(title="post_%d" % index, body="body")
+            Comment.objects.create(body="comment_%d" % index, post=post)
+
+    def test_get_list_select_related(self):
+        self.assertEqual(
+            utils.get_list_select_related(
+                Comment, ('__str__', 'body', 'post', 'post__title')),
+            ['post'])
+        self.assertEqual(
+            utils.get_list_select_related(Post, ('title', 'comments')), [])
+
+    def test_constant_queries_for_related_columns(self):
+        class CommentAdmin(ModelAdmin2):
+            list_display = ('body', 'post', 'post__title')
+
+        model_admin = CommentAdmin(Comment, djadmin2_site)
+        self.create_comments(2)
+        num_queries = self.get_list_queries(model_admin)
+        self.create_comments(10)
+        self.assertEqual(self.get_list_queries(model_admin), num_queries)
+
+    def test_related_path_column(self):
+        class CommentAdmin(ModelAdmin2):
+            list_display = ('body', 'post__title')
+
+        self.create_comments(1)
+        model_admin = CommentAdmin(Comment, djadmin2_site)
+        response = self.get_list_response(model_admin)
+        self.assertContains(response, 'post_0')
+        self.assertContains(response, 'Title')
+
+    def test_sort_by_related_path(self):
+        class CommentAdmin(ModelAdmin2):
+            list_display = ('body', 'post__title')
+
+        self.create_comments(3)
+        model_admin = CommentAdmin(Comment, djadmin2_site)
+
+        queryset = self.get_list_queryset(model_admin, {'sort': '-post__title'})
+        self.assertEqual(
+            [comment.post.title for comment in queryset],
+            ['post_2', 'post_1', 'post_0'])
+        queryset = self.get_list_queryset(model_admin, {'sort': '-missing'})
+        self.assertFalse(queryset.query.order_by)
+
+    def test_explicit_list_select_related(self):
+        class CommentAdmin(ModelAdmin2):
+            list_select_related = ()
+            list_prefetch_related = ('post__comments',)
+            list_display = ('body', 'post')
+
+        queryset = self.get_list_queryset(CommentAdmin(Comment, djadmin2_site))
+        self.assertFalse(queryset.query.select_related)
+        self.assertEqual(queryset._prefetch_related_lookups, ('post__comments',))
+
+
+class ListColumnsTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        post = Post.objects.create(title="post_title", body="post_body")
+        Comment.objects.create(body="comment_body", post=post)
+
+    def test_get_list_only_fields(self):
+        self.assertEqual(
+            utils.get_list_only_fields(
+                Post, ('title', 'published'), ordering=['-published_date']),
+            ['id', 'title', 'published', 'published_date'])
+        self.assertEqual(
+            utils.get_list_only_fields(
+                Comment, ('__str__', 'post__title'), str_fields=('body',),
+                select_related=['post']),
+            ['id', 'body', 'post', 'post__title'])
+        # Relations shown as a column are loaded completely
+        self.assertEqual(
+            utils.get_list_only_fields(Comment, ('post__title', 'post')),
+            ['id', 'post'])
+        self.assertEqual(
+            utils.get_list_only_fields(Post, ('title', 'comments')),
+            ['id', 'title'])
+        self.assertIsNone(utils.get_list_only_fields(Post, ('__str__',)))
+        self.assertIsNone(
+            utils.get_list_only_fields(Post, ('title', 'get_absolute_url')))
+
+    def test_only_shown_columns(self):
+        class PostAdmin(ModelAdmin2):
+            list_display = ('__str__', 'published')
+            list_str_fields = ('title',)
+            ordering = ['-published_date']
+
+        queryset = self.get_list_queryset(PostAdmin(Post, djadmin2_site))
+        post = queryset.get()
+        self.assertEqual(post.get_deferred_fields(), {'body'})
+        self.assertEqual(str(post), 'post_title')
+
+    def test_only_related_columns(self):
+        class CommentAdmin(ModelAdmin2):
+            list_display = ('body', 'post__title')
+
+        queryset = self.get_list_queryset(CommentAdmin(Comment, djadmin2_site))
+        with self.assertNumQueries(1):
+            comment = queryset.get()
+            self.assertEqual(comment.post.title, 'post_title')
+        self.assertEqual(
+            comment.post.get_deferred_fields(),
+            {'body', 'published', 'published_date'})
+
+    def test_list_defer(self):
+        class PostAdmin(ModelAdmin2):
+            list_defer = ('body',)
+
+        queryset = self.get_list_queryset(PostAdmin(Post, djadmin2_site))
+        self.assertEqual(queryset.get().get_deferred_fields(), {'body'})
+        # Without field names for __str__ everything is loaded
+        queryset = self.get_list_queryset(ModelAdmin2(Post, djadmin2_site))
+        self.assertEqual(queryset.get().get_deferred_fields(), set())
+
+    def test_list_renders_projected_rows(self):
+        class PostAdmin(ModelAdmin2):
+            list_display = ('title', 'published_date')
+
+        response = self.get_list_response(PostAdmin(Post, djadmin2_site))
+        self.assertContains(response, 'post_title')
+        self.assertNotContains(response, 'post_body')
+
+
 class PostListTest(BaseIntegrationTest):
 
     def _create_posts(self):
@@ -323,6 +475,214 @@ class PostListTest(BaseIntegrationTest):
         ]))
 
 
+class DateHierarchyTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        cache.clear()
+        for published_date in (datetime(2013, 7, 22), datetime(2012, 5, 20),
+                               datetime(2012, 5, 30), None):
+            Post.objects.create(
+                title="title", body="body", published_date=published_date)
+
+    def get_view(self, params=None, **attrs):
+        attrs.setdefault('date_hierarchy', 'published_date')
+        PostAdmin = type('PostAdmin', (ModelAdmin2,), attrs)
+        model_admin = PostAdmin(Post, djadmin2_site)
+        request = self.factory.get(
+            reverse("admin2:blog_post_index"), params or {})
+        view = views.ModelListView(
+            request=request, kwargs={}, **model_admin.get_index_kwargs())
+        view.object_list = view.get_queryset()
+        return view
+
+    def test_each_level_is_queried_once(self):
+        view = self.get_view()
+        self.assertIs(view.get_date_hierarchy_queryset(), view.object_list)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                view._format_years(view.object_list),
+                [('?year=2012', '2012', None), ('?year=2013', '2013', None)])
+
+        view = self.get_view({'year': '2012'})
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [text for link, text, count in
+                 view._format_months(view.object_list)],
+                ['May 2012'])
+
+    def test_counts(self):
+        view = self.get_view(date_hierarchy_counts=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                view._format_years(view.object_list),
+                [('?year=2012', '2012', 2), ('?year=2013', '2013', 1)])
+
+        view = self.get_view({'year': '2012', 'month': '5'},
+                             date_hierarchy_counts=True)
+        self.assertEqual(
+            view._format_days(view.object_list),
+            [('?year=2012&month=05&day=20', 'May 20', 1),
+             ('?year=2012&month=05&day=30', 'May 30', 1)])
+
+    def test_cached_counts(self):
+        attrs = {'date_hierarchy_counts': True,
+                 'date_hierarchy_cache_timeout': 60}
+        view = self.get_view(**attrs)
+        dates = view._format_years(view.object_list)
+        view = self.get_view(**attrs)
+        with self.assertNumQueries(0):
+            self.assertEqual(view._format_years(view.object_list), dates)
+
+
+class NoPostsPermission(permissions.BasePermission):
+    def filter_queryset(self, request, view, queryset):
+        return queryset.none()
+
+
+class DateHierarchyEmptyListTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        Post.objects.create(
+            title="title", body="body", published_date=datetime(2013, 7, 22))
+
+        class PostAdmin(ModelAdmin2):
+            date_hierarchy = 'published_date'
+            date_hierarchy_counts = True
+            date_hierarchy_cache_timeout = 60
+            search_fields = ('title',)
+            search_cache_timeout = 60
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+
+    def test_search_without_results(self):
+        # The cached primary keys of the search are an empty pk__in
+        for run in range(2):
+            response = self.get_list_response(self.model_admin, {'q': 'missing'})
+            response.render()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context_data['object_list']), 0)
+
+    def test_permission_without_rows(self):
+        class ListView(views.ModelListView):
+            permission_classes = views.ModelListView.permission_classes + (
+                NoPostsPermission,)
+
+        response = self.get_list_response(self.model_admin, view_class=ListView)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context_data['object_list']), 0)
+
+
+class ListQuerysetMemoTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for index in range(3):
+            Post.objects.create(
+                title="title_%d" % index, body="body",
+                published_date=datetime(2012 + index, 1, 1))
+
+        class PostAdmin(ModelAdmin2):
+            list_display = ('title', 'published_date')
+            list_filter = ['published']
+            search_fields = ['title']
+            date_hierarchy = 'published_date'
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+
+    def test_queryset_is_built_once(self):
+        built = []
+
+        class ListView(views.ModelListView):
+            def build_queryset(self):
+                built.append(self.request)
+                return super().build_queryset()
+
+        # The count, the page and the years of the date drilldown
+        with self.assertNumQueries(3):
+            response = self.get_list_response(
+                self.model_admin, {'q': 'title', 'published': '3'},
+                view_class=ListView)
+            response.render()
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len(response.context_data['object_list']), 3)
+
+    def test_get_queryset_returns_copies(self):
+        view = self.get_list_view(self.model_admin)
+        queryset = view.get_queryset()
+        list(queryset)
+        self.assertIsNot(view.get_queryset(), queryset)
+        self.assertIsNone(view.get_queryset()._result_cache)
+
+
+class ListSortTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for title, body in (('b', 'x'), ('a', 'y'), ('c', 'x')):
+            Post.objects.create(title=title, body=body)
+
+        class PostAdmin(ModelAdmin2):
+            list_display = ('__str__', 'title', 'body')
+            str_ordering = ('title',)
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+
+    def get_queryset(self, sort):
+        return self.get_list_queryset(self.model_admin, {'sort': sort})
+
+    def get_titles(self, sort):
+        return [post.title for post in self.get_queryset(sort)]
+
+    def test_str_ordering(self):
+        self.assertEqual(self.get_titles('__str__'), ['a', 'b', 'c'])
+        queryset = self.get_queryset('-__str__')
+        # Reversed in SQL, not in Python
+        self.assertEqual(queryset.query.order_by, ('-title',))
+        self.assertEqual([post.title for post in queryset], ['c', 'b', 'a'])
+
+    def test_str_falls_back_to_admin_ordering(self):
+        self.model_admin.str_ordering = None
+        self.model_admin.ordering = ['-title']
+        self.assertEqual(self.get_titles('-__str__'), ['a', 'b', 'c'])
+
+    def test_multiple_columns(self):
+        self.assertEqual(self.get_titles('body,-title'), ['c', 'b', 'a'])
+        self.assertEqual(self.get_titles('-body, title'), ['a', 'b', 'c'])
+
+    def test_only_listed_columns(self):
+        queryset = self.get_queryset('published,body,-body')
+        self.assertEqual(queryset.query.order_by, ('body',))
+        self.assertFalse(self.get_queryset('id').query.order_by)
+
+    def get_headers(self, sort):
+        view = self.get_list_view(self.model_admin, {'sort': sort})
+        return dict((header['name'], header) for header in view.get_sort_headers())
+
+    def test_sort_headers(self):
+        headers = self.get_headers('-body,title')
+        # The first key is reversed, the others become the first key
+        self.assertEqual(headers['body']['url'], './?sort=body,title')
+        self.assertEqual(headers['title']['url'], './?sort=title,-body')
+        self.assertEqual(headers['__str__']['url'], './?sort=__str__,-body,title')
+        self.assertEqual(
+            [(headers[name].get('priority'), headers[name].get('descending'))
+             for name in ('__str__', 'title', 'body')],
+            [(None, None), (2, False), (1, True)])
+        self.assertEqual(headers['body']['remove_url'], './?sort=title')
+        self.assertEqual(self.get_headers('title')['title']['remove_url'], './')
+
+    def test_sort_links_in_list(self):
+        response = self.get_list_response(self.model_admin, {'sort': '-body,title'})
+        response.render()
+        self.assertContains(response, "href='./?sort=title,-body'")
+        self.assertContains(response, 'glyphicon-triangle-bottom')
+        self.assertContains(response, '<span class="sort_priority">2</span>')
+
+
 class PostListTestCustomAction(BaseIntegrationTest):
 
     def test_publish_action_displayed_in_list(self):
@@ -489,6 +849,96 @@ class PostDeleteActionTest(BaseIntegrationTest):
         self.assertContains(response, "Successfully deleted 2 post")
 
 
+class PostExportActionTest(BaseIntegrationTest):
+
+    def setUp(self):
+        super().setUp()
+        self.first = Post.objects.create(title="first, \"quoted\"", body="<b>")
+        self.second = Post.objects.create(title="second", body="body")
+
+    def export(self, action, **data):
+        data.update({
+            'action': action,
+            'selected_model_pk': [self.first.pk, self.second.pk],
+        })
+        response = self.client.post(reverse("admin2:blog_post_index"), data)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, content = self.export('CSVExportAction')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename="post.csv"')
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows[0], ['Title', 'Body', 'Published', 'Published date'])
+        self.assertEqual(
+            sorted(rows[1:]),
+            [['first, "quoted"', '<b>', 'False', ''],
+             ['second', 'body', 'False', '']])
+
+    def test_csv_formulas_are_escaped(self):
+        self.first.title = '=HYPERLINK("http://example.com")'
+        self.first.save()
+        self.second.title = '-2+3'
+        self.second.body = '@SUM(A1)'
+        self.second.save()
+        response, content = self.export('CSVExportAction')
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(
+            sorted(row[:2] for row in rows[1:]),
+            [["'-2+3", "'@SUM(A1)"],
+             ['\'=HYPERLINK("http://example.com")', '<b>']])
+
+    def test_column_selection(self):
+        response, content = self.export(
+            'JSONLinesExportAction', export_column=['title', 'missing'])
+        lines = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            sorted(lines, key=lambda line: line['title']),
+            [{'title': 'first, "quoted"'}, {'title': 'second'}])
+
+    def test_json_lines_keys_are_column_names(self):
+        writer = exports.JSONLinesExportWriter(
+            ['Title', 'Title'], names=['title', 'post__title'])
+        content = ''.join(writer.write([['comment', 'post']]))
+        self.assertEqual(
+            json.loads(content), {'title': 'comment', 'post__title': 'post'})
+
+    def test_xlsx(self):
+        response, content = self.export('XLSXExportAction')
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t xml:space="preserve">Title</t>', sheet)
+        self.assertIn('&lt;b&gt;', sheet)
+        self.assertIn('<c t="b"><v>0</v></c>', sheet)
+        self.assertEqual(sheet.count('<row>'), 3)
+
+    def test_nothing_selected(self):
+        response = self.client.post(
+            reverse("admin2:blog_post_index"), {'action': 'CSVExportAction'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_filtered_list(self):
+        class ExportListAction(CSVExportAction):
+            only_selected = False
+
+        class PostAdmin(ModelAdmin2):
+            list_display = ('title',)
+            search_fields = ('title',)
+            list_actions = [ExportListAction]
+
+        model_admin = PostAdmin(Post, djadmin2_site)
+        request = RequestFactory().post(
+            reverse("admin2:blog_post_index") + '?q=second',
+            {'action': 'ExportListAction'})
+        request.user = self.user
+        view = views.ModelListView.as_view(**model_admin.get_index_kwargs())
+        content = b''.join(view(request).streaming_content).decode()
+        self.assertEqual(content.splitlines(), ['Title', 'second'])
+
+
 class TestAuthViews(TestCase):
 
     def setUp(self):
@@ -557,3 +1007,98 @@ class TestAuthViews(TestCase):
         index_path = reverse('admin2:dashboard') + '?next=/admin2/blog/post/'
         target_path = reverse('admin2:blog_post_index')
         self.assertRedirects(self.client.get(target_path), index_path)
+
+
+class ShowAllTest(ListViewTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            Post.objects.create(title="post_%d" % index, body="body")
+
+        class PostAdmin(ModelAdmin2):
+            list_display = ('title',)
+            list_per_page = 2
+            list_max_show_all = 3
+            ordering = ['title']
+
+        self.model_admin = PostAdmin(Post, djadmin2_site)
+
+    def get(self, view_class, url_name, **params):
+        return self.get_list_response(
+            self.model_admin, params, url_name, view_class)
+
+    def get_content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_show_all_link(self):
+        response = self.get(views.ModelListView, "admin2:blog_post_index", q='post')
+        self.assertContains(response, '?q=post&amp;all=1')
+
+    def test_streams_up_to_list_max_show_all(self):
+        class ListView(views.ModelListView):
+            stream_chunk_size = 2
+
+        response = self.get(ListView, "admin2:blog_post_index", all='1')
+        self.assertTrue(response.streaming)
+        content = self.get_content(response)
+        self.assertIn('</html>', content)
+        self.assertNotIn('djadmin2-rows-', content)
+        for index in range(3):
+            self.assertIn('>post_%d<' % index, content)
+        self.assertNotIn('>post_3<', content)
+        self.assertIn('Load more', content)
+
+    def test_load_more(self):
+        content = self.get_content(
+            self.get(views.ModelListView, "admin2:blog_post_index", all='1'))
+        url = re.search(r'data-rows-url="([^"]+)"', content).group(1)
+        params = QueryDict(url.split('?', 1)[1].replace('&amp;', '&'))
+        response = self.get(
+            views.ModelListRowsView, "admin2:blog_post_rows", **params.dict())
+        content = self.get_content(response)
+        self.assertNotIn('<html', content)
+        self.assertIn('>post_3<', content)
+        self.assertIn('>post_4<', content)
+        self.assertNotIn('>post_2<', content)
+        self.assertNotIn('Load more', content)
+
+    def test_invalid_cursor(self):
+        for view_class, url_name in (
+                (views.ModelListView, "admin2:blog_post_index"),
+                (views.ModelListRowsView, "admin2:blog_post_rows")):
+            with self.assertRaises(Http404):
+                self.get(view_class, url_name, all='1',
+                         cursor=encode_cursor('n', ['post_1', 'abc']))
+
+    def test_no_full_table_read(self):
+        for index in range(5, 30):
+            Post.objects.create(title="post_%d" % index, body="body")
+        with CaptureQueriesContext(connection) as queries:
+            content = self.get_content(
+                self.get(views.ModelListView, "admin2:blog_post_index", all='1'))
+        self.assertEqual(content.count('>post_'), 3)
+        self.assertIn('0</span> selected', content)
+        self.assertNotIn('of 30', content)
+        post_queries = [query['sql'] for query in queries
+                        if 'FROM "blog_post"' in query['sql']]
+        # The rows, the date drilldown has no date_hierarchy here
+        self.assertEqual(len(post_queries), 1, post_queries)
+        self.assertIn('LIMIT 4', post_queries[0])
+
+    def test_ordering_without_cursor(self):
+        self.model_admin.ordering = ['?']
+        content = self.get_content(
+            self.get(views.ModelListView, "admin2:blog_post_index", all='1'))
+        self.assertEqual(content.count('>post_'), 3)
+        self.assertNotIn('Load more', content)
+        with self.assertRaises(Http404):
+            self.get(views.ModelListRowsView, "admin2:blog_post_rows", all='1',
+                     cursor=encode_cursor('n', ['post_1', 1]))
+
+    def test_disabled(self):
+        self.model_admin.list_max_show_all = 0
+        response = self.get(views.ModelListView, "admin2:blog_post_index", all='1')
+        self.assertFalse(response.streaming)
+        with self.assertRaises(Http404):
+            self.get(views.ModelListRowsView, "admin2:blog_post_rows")
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.urls import reverse
+
+from djadmin2 import views
+
+
+class ListViewTestCase(TestCase):
+
+    """
+    Base TestCase for the tests of the list view, which request it as a
+    superuser.
+    """
+    url_name = "admin2:blog_post_index"
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = get_user_model()(username='user', is_staff=True,
+                                     is_superuser=True)
+        self.user.save()
+
+    def get_request(self, params=None, url_name=None):
+        request = self.factory.get(
+            reverse(url_name or self.url_name), params or {})
+        request.user = self.user
+        return request
+
+    def get_list_view(self, model_admin, params=None, url_name=None,
+                      view_class=views.ModelListView):
+        """
+        Returns the list view of the model admin, set up for a request with
+        the given parameters.
+        """
+        return view_class(
+            request=self.get_request(params, url_name),
+            **model_admin.get_index_kwargs())
+
+    def get_list_queryset(self, model_admin, params=None, url_name=None):
+        return self.get_list_view(model_admin, params, url_name).get_queryset()
+
+    def get_list_response(self, model_admin, params=None, url_name=None,
+                          view_class=views.ModelListView):
+        view = view_class.as_view(**model_admin.get_index_kwargs())
+        return view(self.get_request(params, url_name))
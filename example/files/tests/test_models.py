@@ -5,6 +5,8 @@ from django.test import TestCase
 from django.urls import reverse
 from files.models import CaptionedFile
 
+from .utils import TemporaryMediaMixin
+
 
 fixture_dir = path.join(path.abspath(path.dirname(__file__)), 'fixtures')
 
@@ -41,8 +43,9 @@ class CaptionedFileTestCase(TestCase):
         self.assertEqual(CaptionedFile.objects.count(), 0)
 
 
-class MultiEncodedAdminFormTest(TestCase):
+class MultiEncodedAdminFormTest(TemporaryMediaMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.user = User(
             username='admin',
             is_staff=True,
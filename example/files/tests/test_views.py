@@ -6,18 +6,20 @@ from django.test import TestCase, Client
 from django.utils.encoding import force_str
 
 from ..models import CaptionedFile
+from .utils import TemporaryMediaMixin
 
 fixture_dir = path.join(path.abspath(path.dirname(__file__)), 'fixtures')
 fixture_file = path.join(fixture_dir, 'pubtest.txt')
 
 
-class BaseIntegrationTest(TestCase):
+class BaseIntegrationTest(TemporaryMediaMixin, TestCase):
 
     """
     Base TestCase for integration tests.
     """
 
     def setUp(self):
+        super().setUp()
         self.client = Client()
         self.user = get_user_model()(username='user', is_staff=True,
                                      is_superuser=True)
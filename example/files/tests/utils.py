@@ -0,0 +1,20 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class TemporaryMediaMixin:
+
+    """
+    Stores the files that a test uploads in a temporary ``MEDIA_ROOT``,
+    which is removed after the test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)